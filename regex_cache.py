@@ -0,0 +1,255 @@
+'''
+A persistent cache, kept in a directory on disk, of compiled regexs: the
+FlatRegexTree and the complete DFA table (see build_dfa_table) of each one.
+Entries are content addressed: each is stored in a file named after a hash
+of the regex string, so every process using the same directory shares them.
+Files are memory-mapped when loaded, so processes share their pages too.
+
+Every file starts with MAGIC and FORMAT_VERSION, and a file written by any
+other version is rebuilt rather than read. New entries are written to a
+temporary file and renamed into place, so a reader (or a second writer of
+the same entry) never sees a half written file. When the files take up more
+than max_bytes, the least recently used ones are deleted, along with any
+temporary file left behind by a writer that died. A file whose length does
+not match its header is rebuilt too.
+'''
+import os
+import time
+import mmap
+import struct
+import hashlib
+import tempfile
+from array import array
+from regex_functions import parse
+from regex_flat import FlatRegexTree, flatten
+from regex_dfa import ALPHABET, SYMBOL_CODES, build_dfa_table
+
+# the first bytes of every cache file, and the version of its layout
+MAGIC = b'RXDFA'
+FORMAT_VERSION = 1
+# after MAGIC: the version, a padding byte (so the int arrays after the
+# header are aligned), the number of tree nodes and the number of DFA states
+HEADER = struct.Struct('<5sHxII')
+# the end of the name of every cache file
+SUFFIX = '.rxdfa'
+# the end of the name of a file still being written
+TEMPORARY_SUFFIX = '.tmp'
+# how old (in seconds) a temporary file is when its writer is taken to have
+# died before renaming it
+STALE_SECONDS = 3600
+
+
+def file_size(nodes, states):
+    '''(int, int) -> int
+
+    Return the length of a cache file holding a tree of nodes nodes and a DFA
+    of states states
+
+    >>> file_size(4, 3)
+    91
+    '''
+    return (HEADER.size + nodes * 4 * 2 + states * len(ALPHABET) * 4 + nodes +
+            states)
+
+
+class CompiledRegex:
+    '''A regex loaded from (or just written to) an AutomatonCache: its
+    FlatRegexTree and its complete DFA, both backed by the memory-mapped
+    cache file.
+    '''
+    def __init__(self, data):
+        '''(CompiledRegex, mmap.mmap) -> NoneType
+
+        A new CompiledRegex read from the cache file mapped as data
+
+        REQ: data must hold a whole cache file of FORMAT_VERSION
+        '''
+        self._data = data
+        magic, version, nodes, states = HEADER.unpack_from(data)
+        view = memoryview(data)
+        start = HEADER.size
+        # each part of the file, as a view of the mapped pages (the int
+        # arrays first, so they stay aligned)
+        parts = []
+        for size, code in [(nodes * 4, 'i'), (nodes * 4, 'i'),
+                           (states * len(ALPHABET) * 4, 'i'), (nodes, 'b'),
+                           (states, 'B')]:
+            parts.append(view[start:start + size].cast(code))
+            start += size
+        lefts, rights, table, ops, accepting = parts
+        self._tree = FlatRegexTree(ops, lefts, rights)
+        # one row of len(ALPHABET) next states per state; state 0 is the start
+        self._table = table
+        self._accepting = accepting
+
+    def get_tree(self):
+        '''(CompiledRegex) -> FlatRegexTree
+
+        Return the tree of this regex
+        '''
+        return self._tree
+
+    def __len__(self):
+        '''(CompiledRegex) -> int
+
+        Return the number of states of the DFA of this regex
+        '''
+        return len(self._accepting)
+
+    def match(self, s):
+        '''(CompiledRegex, str) -> bool
+
+        Return whether s matches this regex
+        '''
+        table = self._table
+        codes = SYMBOL_CODES
+        width = len(ALPHABET)
+        state = 0
+        for char in s:
+            code = codes.get(char)
+            if code is None:
+                return False
+            state = table[state * width + code]
+        return bool(self._accepting[state])
+
+
+class AutomatonCache:
+    '''A directory of compiled regexs, shared by every process using it.'''
+    def __init__(self, directory, max_bytes=64 << 20):
+        '''(AutomatonCache, str[, int]) -> NoneType
+
+        A new AutomatonCache keeping its files in directory (which is made if
+        needed), deleting the least recently used ones once together they
+        take up more than max_bytes.
+
+        REQ: max_bytes >= 0
+        '''
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+
+    def path_for(self, regex):
+        '''(AutomatonCache, str) -> str
+
+        Return the path of the cache file for the regex string regex
+        '''
+        name = hashlib.sha256(regex.encode('utf-8')).hexdigest() + SUFFIX
+        return os.path.join(self._directory, name)
+
+    def get(self, regex):
+        '''(AutomatonCache, str) -> CompiledRegex
+
+        Return the compiled regex string regex, from the cache if it is there
+        (and was written by this FORMAT_VERSION), or else compiled now and
+        added to the cache. A RegexParseError is raised if regex is not a
+        valid regex.
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     cache = AutomatonCache(directory)
+        ...     compiled = cache.get('(0.1*)*')
+        ...     again = AutomatonCache(directory).get('(0.1*)*')
+        ...     print(again.match('0110'), again.match('10'), len(again))
+        True False 4
+        '''
+        path = self.path_for(regex)
+        compiled = self._load(path)
+        if compiled is None:
+            tree = parse(regex)
+            # another process could evict the file before it is loaded
+            while compiled is None:
+                self._store(path, tree)
+                compiled = self._load(path)
+            # the mapped file stays readable even if it is evicted now
+            self._evict()
+        return compiled
+
+    def _load(self, path):
+        '''(AutomatonCache, str) -> CompiledRegex
+
+        Return the regex compiled in the cache file at path, or None if there
+        is no such file, it is of another FORMAT_VERSION, or its length does
+        not match its header (a truncated or corrupt file). Loading a file
+        marks it as used now.
+        '''
+        try:
+            with open(path, 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # the time it was last used, for evicting the least recently used
+            os.utime(path)
+        # missing (maybe just evicted by another process), or empty
+        except (FileNotFoundError, ValueError):
+            return None
+        if (len(data) < HEADER.size or
+                HEADER.unpack_from(data)[:2] != (MAGIC, FORMAT_VERSION) or
+                len(data) != file_size(*HEADER.unpack_from(data)[2:])):
+            data.close()
+            return None
+        return CompiledRegex(data)
+
+    def _store(self, path, r):
+        '''(AutomatonCache, str, RegexTree) -> NoneType
+
+        Compiles the RegexTree rooted at r and writes it to the cache file at
+        path, through a temporary file that is then renamed to path (which
+        replaces a file in one step, even if another process is writing the
+        same file).
+        '''
+        ops, lefts, rights = flatten(r).get_arrays()
+        rows, accepting = build_dfa_table(r)
+        table = array('i')
+        for row in rows:
+            table.extend(row)
+        handle, temporary = tempfile.mkstemp(dir=self._directory,
+                                             suffix=TEMPORARY_SUFFIX)
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(ops),
+                                       len(rows)))
+                for part in [lefts, rights, table, ops]:
+                    file.write(part.tobytes())
+                file.write(bytes(accepting))
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def _evict(self):
+        '''(AutomatonCache) -> NoneType
+
+        Deletes the temporary files left by writers that died more than
+        STALE_SECONDS ago, then the least recently used cache files until the
+        rest (and the temporary files still being written) take up no more
+        than max_bytes.
+        '''
+        files = []
+        total = 0
+        stale = time.time() - STALE_SECONDS
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(SUFFIX) or entry.name.endswith(
+                    TEMPORARY_SUFFIX):
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue
+                total += info.st_size
+                if entry.name.endswith(SUFFIX):
+                    files.append((info.st_mtime, info.st_size, entry.path))
+                elif info.st_mtime < stale:
+                    # put first, so it is always deleted
+                    files.append((float('-inf'), info.st_size, entry.path))
+        files.sort()
+        for used, size, path in files:
+            if total <= self._max_bytes and used != float('-inf'):
+                break
+            # another process may have deleted it already
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
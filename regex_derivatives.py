@@ -0,0 +1,369 @@
+'''
+A second matching engine based on Brzozowski derivatives. The derivative of
+a regex r by a symbol c is a regex matching every s such that r matches c + s,
+so s matches r exactly when the derivative of r by every character of s, in
+turn, matches the empty string.
+
+Derivatives are simplified and hash-consed (every distinct tree is built only
+once), so the same derivative is never computed twice and equal trees can be
+compared and looked up by identity.
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf, SetLeaf
+
+# the regex that matches nothing at all is represented by None, since no
+# RegexTree can stand for it
+NOTHING = None
+
+
+class DerivativeMatcher:
+    '''Matches strings against a RegexTree by taking derivatives of it, which
+    are remembered so that every later string costs one dict lookup per
+    character.
+    '''
+    def __init__(self, r):
+        '''(DerivativeMatcher, RegexTree) -> NoneType
+
+        A new DerivativeMatcher for the RegexTree rooted at r
+
+        REQ: r must be a valid RegexTree
+        '''
+        # maps (symbol, id of each child) to the one tree built for it
+        self._interned = {}
+        # the order each interned tree was built in, used to sort the
+        # operands of a bar so that (r1|r2) and (r2|r1) are the same tree
+        self._order = {}
+        # whether each interned tree (by id) matches the empty string
+        self._nullable = {}
+        # maps (id of tree, symbol) to the derivative of the tree by symbol
+        self._derivatives = {}
+        self._root = self.intern(r)
+
+    def __len__(self):
+        '''(DerivativeMatcher) -> int
+
+        Return the number of distinct trees built so far
+        '''
+        return len(self._interned)
+
+    def _make(self, symbol, children, build):
+        '''(DerivativeMatcher, str, list of RegexTree, function) -> RegexTree
+
+        Return the interned tree with symbol and (already interned) children,
+        calling build to create it if there is none yet.
+        '''
+        key = (symbol,) + tuple(id(child) for child in children)
+        node = self._interned.get(key)
+        if node is None:
+            node = build()
+            self._interned[key] = node
+            self._order[id(node)] = len(self._order)
+        return node
+
+    def leaf(self, symbol):
+        '''(DerivativeMatcher, str) -> Leaf
+
+        Return the interned Leaf for symbol (a SetLeaf if symbol holds more
+        than one of them)
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> matcher.leaf('1') is matcher.leaf('1')
+        True
+        >>> matcher.intern(StarTree(SetLeaf('02')))
+        StarTree(SetLeaf('02'))
+        '''
+        if len(symbol) > 1:
+            result = self._make(symbol, [], lambda: SetLeaf(symbol))
+        else:
+            result = self._make(symbol, [], lambda: Leaf(symbol))
+        return result
+
+    def star(self, child):
+        '''(DerivativeMatcher, RegexTree) -> RegexTree
+
+        Return the simplified, interned tree for child*
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> one_star = matcher.star(matcher.leaf('1'))
+        >>> matcher.star(one_star) is one_star
+        True
+        >>> matcher.star(matcher.leaf('e'))
+        Leaf('e')
+        '''
+        # nothing* and e* only match the empty string
+        if child is NOTHING or child.get_symbol() == 'e':
+            result = self.leaf('e')
+        # r** matches the same strings as r*
+        elif child.get_symbol() == '*':
+            result = child
+        else:
+            result = self._make('*', [child], lambda: StarTree(child))
+        return result
+
+    def dot(self, left, right):
+        '''(DerivativeMatcher, RegexTree, RegexTree) -> RegexTree
+
+        Return the simplified, interned tree for (left.right)
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> matcher.dot(matcher.leaf('e'), matcher.leaf('1'))
+        Leaf('1')
+        '''
+        # nothing followed by anything (or the reverse) matches nothing
+        if left is NOTHING or right is NOTHING:
+            result = NOTHING
+        # e is the identity of concatenation
+        elif left.get_symbol() == 'e' and not left.get_children():
+            result = right
+        elif right.get_symbol() == 'e' and not right.get_children():
+            result = left
+        else:
+            result = self._make('.', [left, right],
+                                lambda: DotTree(left, right))
+        return result
+
+    def bar(self, left, right):
+        '''(DerivativeMatcher, RegexTree, RegexTree) -> RegexTree
+
+        Return the simplified, interned tree for (left|right). Nested bars are
+        flattened, their operands sorted and duplicates removed, so that the
+        number of different derivatives of any tree is finite.
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> one, two = matcher.leaf('1'), matcher.leaf('2')
+        >>> matcher.bar(one, one)
+        Leaf('1')
+        >>> matcher.bar(one, two) is matcher.bar(two, one)
+        True
+        >>> matcher.bar(matcher.bar(one, two), one) is matcher.bar(one, two)
+        True
+        '''
+        # collect every operand of the bars being joined, without duplicates
+        operands = {}
+        to_split = [left, right]
+        while to_split:
+            node = to_split.pop()
+            # nothing is the identity of |
+            if node is NOTHING:
+                continue
+            if node.get_symbol() == '|':
+                to_split.extend(node.get_children())
+            else:
+                operands[id(node)] = node
+        if not operands:
+            return NOTHING
+        ordered = sorted(operands.values(), key=lambda n: self._order[id(n)])
+        # rebuild the bars nested to the right: (r1|(r2|(r3|...)))
+        result = ordered.pop()
+        while ordered:
+            first = ordered.pop()
+            rest = result
+            result = self._make('|', [first, rest],
+                                lambda: BarTree(first, rest))
+        return result
+
+    def intern(self, r):
+        '''(DerivativeMatcher, RegexTree) -> RegexTree
+
+        Return the simplified, interned copy of the RegexTree rooted at r.
+        The tree is walked with an explicit stack (children first).
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> matcher.intern(DotTree(Leaf('e'), StarTree(StarTree(Leaf('2')))))
+        StarTree(Leaf('2'))
+        '''
+        # interned copies of the subtrees done so far, in postorder
+        done = []
+        to_intern = [(r, False)]
+        while to_intern:
+            node, children_done = to_intern.pop()
+            children = node.get_children()
+            if children and not children_done:
+                to_intern.append((node, True))
+                for child in reversed(children):
+                    to_intern.append((child, False))
+            elif not children:
+                done.append(self.leaf(node.get_symbol()))
+            elif node.get_symbol() == '*':
+                done.append(self.star(done.pop()))
+            else:
+                right = done.pop()
+                left = done.pop()
+                if node.get_symbol() == '|':
+                    done.append(self.bar(left, right))
+                else:
+                    done.append(self.dot(left, right))
+        return done.pop()
+
+    def nullable(self, r):
+        '''(DerivativeMatcher, RegexTree) -> bool
+
+        Return whether the interned tree r matches the empty string
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> matcher.nullable(matcher.intern(DotTree(Leaf('1'), Leaf('e'))))
+        False
+        >>> matcher.nullable(matcher.intern(BarTree(Leaf('1'), Leaf('e'))))
+        True
+        '''
+        if r is NOTHING:
+            return False
+        result = self._nullable.get(id(r))
+        if result is None:
+            # work out every subtree that has not been seen yet, children first
+            to_check = [(r, False)]
+            while to_check:
+                node, children_done = to_check.pop()
+                if id(node) in self._nullable:
+                    continue
+                children = node.get_children()
+                if children and not children_done:
+                    to_check.append((node, True))
+                    for child in children:
+                        to_check.append((child, False))
+                    continue
+                symbol = node.get_symbol()
+                if not children:
+                    value = (symbol == 'e')
+                elif symbol == '*':
+                    value = True
+                elif symbol == '|':
+                    value = (self._nullable[id(children[0])] or
+                             self._nullable[id(children[1])])
+                else:
+                    value = (self._nullable[id(children[0])] and
+                             self._nullable[id(children[1])])
+                self._nullable[id(node)] = value
+            result = self._nullable[id(r)]
+        return result
+
+    def derivative(self, r, symbol):
+        '''(DerivativeMatcher, RegexTree, str) -> RegexTree
+
+        Return the (remembered) derivative of the interned tree r by symbol,
+        or NOTHING if no string starting with symbol matches r.
+
+        >>> matcher = DerivativeMatcher(Leaf('1'))
+        >>> tree = matcher.intern(DotTree(StarTree(Leaf('1')), Leaf('0')))
+        >>> matcher.derivative(tree, '1') is tree
+        True
+        >>> matcher.derivative(tree, '0')
+        Leaf('e')
+        >>> matcher.derivative(tree, '2') is NOTHING
+        True
+
+        The tree is walked with an explicit stack, so it can be of any depth:
+
+        >>> deep = Leaf('0')
+        >>> for i in range(5000):
+        ...     deep = DotTree(deep, Leaf('1'))
+        >>> derivative_match(deep, '0' + '1' * 5000)
+        True
+        '''
+        if r is NOTHING:
+            return NOTHING
+        derivatives = self._derivatives
+        # derive every subtree that has not been derived by symbol yet,
+        # children first, with an explicit stack so r can be of any depth
+        to_derive = [(r, False)]
+        while to_derive:
+            node, children_done = to_derive.pop()
+            if (id(node), symbol) in derivatives:
+                continue
+            children = node.get_children()
+            # d(r1.r2) only needs d(r2) if r1 can match the empty string
+            if node.get_symbol() == '.' and not self.nullable(children[0]):
+                children = children[:1]
+            if children and not children_done:
+                to_derive.append((node, True))
+                for child in children:
+                    to_derive.append((child, False))
+            else:
+                derivatives[(id(node), symbol)] = self._derive(node, symbol)
+        return derivatives[(id(r), symbol)]
+
+    def _derive(self, r, symbol):
+        '''(DerivativeMatcher, RegexTree, str) -> RegexTree
+
+        Return the derivative of the interned tree r by symbol, made from the
+        remembered derivatives of its children (which must all be there).
+        '''
+        derivatives = self._derivatives
+        children = r.get_children()
+        # a leaf: its own symbol (or any of them, for a SetLeaf) leaves
+        # nothing more to match
+        if not children:
+            if symbol in r.get_symbol() and symbol != 'e':
+                result = self.leaf('e')
+            else:
+                result = NOTHING
+        # d(r*) = d(r).r*
+        elif r.get_symbol() == '*':
+            result = self.dot(derivatives[(id(children[0]), symbol)], r)
+        # d(r1|r2) = d(r1)|d(r2)
+        elif r.get_symbol() == '|':
+            result = self.bar(derivatives[(id(children[0]), symbol)],
+                              derivatives[(id(children[1]), symbol)])
+        # d(r1.r2) = d(r1).r2, or d(r2) as well if r1 can match nothing
+        else:
+            result = self.dot(derivatives[(id(children[0]), symbol)],
+                              children[1])
+            if self.nullable(children[0]):
+                result = self.bar(result,
+                                  derivatives[(id(children[1]), symbol)])
+        return result
+
+    def match(self, s):
+        '''(DerivativeMatcher, str) -> bool
+
+        Return whether s matches the RegexTree this matcher was built for
+
+        >>> matcher = DerivativeMatcher(StarTree(BarTree(Leaf('0'),
+        ...                                              Leaf('1'))))
+        >>> matcher.match('010110100101010')
+        True
+        >>> matcher.match('0102001010')
+        False
+        '''
+        # looking these up once instead of on every character
+        derivatives = self._derivatives
+        state = self._root
+        for char in s:
+            # after the first time, this is the only work done per character
+            key = (id(state), char)
+            if key in derivatives:
+                state = derivatives[key]
+            else:
+                state = self.derivative(state, char)
+            if state is NOTHING:
+                return False
+        return self.nullable(state)
+
+
+def derivative_match(r, s):
+    '''(RegexTree, str) -> bool
+
+    Returns whether or not s is a matching string to the given RegexTree
+    (rooted at r), using the same rules as regex_match.
+
+    REQ: r must be a valid RegexTree
+    REQ: s must be a string
+
+    >>> derivative_match(StarTree(Leaf('1')), '111111111111111111111111111111')
+    True
+    >>> derivative_match(StarTree(BarTree(Leaf('0'), Leaf('1'))), '')
+    True
+    >>> tree = BarTree(DotTree(Leaf('0'), Leaf('1')),
+    ...                DotTree(Leaf('1'), StarTree(Leaf('e'))))
+    >>> derivative_match(tree, '01')
+    True
+    >>> derivative_match(tree, '1')
+    True
+    >>> derivative_match(tree, '1eeeeeeeee')
+    False
+    '''
+    return DerivativeMatcher(r).match(s)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,365 @@
+'''
+A lazily built DFA for matching many strings against the same RegexTree.
+DFA states are sets of states of the Thompson NFA from regex_nfa.py and are
+only built the first time a transition needs them. At most max_states of
+them are kept; when the cache is full, the least recently used state is
+evicted and rebuilt if it is ever needed again.
+'''
+from collections import OrderedDict
+from regextree import StarTree, DotTree, BarTree, Leaf
+from regex_nfa import compile_nfa
+
+# the symbols a string can be made of, and their column in the DFA tables
+ALPHABET = '012'
+SYMBOL_CODES = {'0': 0, '1': 1, '2': 2}
+# marks a transition that has not been built yet
+UNKNOWN = -1
+
+
+class LazyDFA:
+    '''A DFA for a RegexTree whose states are built on demand and kept in a
+    least recently used cache of bounded size.
+    '''
+    def __init__(self, r, max_states=1024):
+        '''(LazyDFA, RegexTree, int) -> NoneType
+
+        A new LazyDFA matching the same strings as the RegexTree rooted at r,
+        keeping at most max_states DFA states at a time.
+
+        REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+        REQ: max_states >= 2
+        '''
+        if max_states < 2:
+            raise ValueError('a LazyDFA needs room for at least 2 states')
+        self._nfa = compile_nfa(r)
+        self._max_states = max_states
+        # the set of NFA states behind every slot (None for free slots)
+        self._keys = []
+        # whether each slot is an accepting state
+        self._accepting = []
+        # the dense transition table: one row per slot, one column per symbol
+        self._table = []
+        # the (slot, column) pairs whose transition leads into each slot, so
+        # they can be forgotten when that slot is evicted
+        self._incoming = []
+        # maps a set of NFA states to the slot holding it
+        self._slots = {}
+        # slots in order of use, least recently used first
+        self._recent = OrderedDict()
+        # the NFA states active before anything is read
+        self._initial = self._nfa.initial()
+        # cache statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        '''(LazyDFA) -> int
+
+        Return the number of DFA states currently cached
+        '''
+        return len(self._slots)
+
+    def get_stats(self):
+        '''(LazyDFA) -> dict of {str: int}
+
+        Return the number of transitions found in the cache ('hits'), the
+        number that had to be built ('misses'), the number of states evicted
+        ('evictions') and the number of states currently cached ('states').
+        '''
+        return {'hits': self._hits, 'misses': self._misses,
+                'evictions': self._evictions, 'states': len(self._slots)}
+
+    def _slot_for(self, key):
+        '''(LazyDFA, frozenset of int) -> int
+
+        Return the slot holding the DFA state for the NFA states key, building
+        it (and evicting the least recently used state if the cache is full)
+        if it is not cached.
+        '''
+        slot = self._slots.get(key)
+        if slot is None:
+            # evict a state (reusing its slot), or grow the table
+            if len(self._keys) >= self._max_states:
+                slot = self._evict()
+            else:
+                slot = len(self._keys)
+                self._keys.append(None)
+                self._accepting.append(False)
+                self._table.append(None)
+                self._incoming.append(None)
+            self._keys[slot] = key
+            self._accepting[slot] = self._nfa.get_accept() in key
+            self._table[slot] = [UNKNOWN] * len(ALPHABET)
+            self._incoming[slot] = set()
+            self._slots[key] = slot
+        self._recent[slot] = None
+        self._recent.move_to_end(slot)
+        return slot
+
+    def _evict(self):
+        '''(LazyDFA) -> int
+
+        Removes the least recently used state from the cache, forgets every
+        transition into or out of it, and returns its (now empty) slot.
+        '''
+        slot = self._recent.popitem(last=False)[0]
+        # transitions into the evicted state must be rebuilt later
+        for source, code in self._incoming[slot]:
+            if self._table[source][code] == slot:
+                self._table[source][code] = UNKNOWN
+        # the states it leads to no longer have it as a source
+        for code, target in enumerate(self._table[slot]):
+            if target != UNKNOWN:
+                self._incoming[target].discard((slot, code))
+        del self._slots[self._keys[slot]]
+        self._keys[slot] = None
+        self._evictions += 1
+        return slot
+
+    def _transition(self, slot, code):
+        '''(LazyDFA, int, int) -> int
+
+        Builds, caches and returns the transition out of slot on the symbol
+        in column code.
+        '''
+        self._misses += 1
+        # touching slot first keeps it from being evicted by its own successor
+        self._recent.move_to_end(slot)
+        key = self._nfa.step(self._keys[slot], ALPHABET[code])
+        target = self._slot_for(key)
+        self._table[slot][code] = target
+        self._incoming[target].add((slot, code))
+        return target
+
+    def start(self):
+        '''(LazyDFA) -> int
+
+        Return the slot of the state the DFA is in before anything is read
+        '''
+        return self._slot_for(self._initial)
+
+    def advance(self, slot, s):
+        '''(LazyDFA, int, str) -> int
+
+        Return the slot the DFA is in after reading s from the state in slot,
+        or UNKNOWN if s contains a symbol that is not in ALPHABET (or slot is
+        UNKNOWN already).
+        '''
+        if slot == UNKNOWN:
+            return UNKNOWN
+        # looking these up once instead of on every character
+        table = self._table
+        codes = SYMBOL_CODES
+        recent = self._recent
+        misses = self._misses
+        for index, char in enumerate(s):
+            code = codes.get(char)
+            if code is None:
+                # the characters before this one were still read
+                self._hits += index - (self._misses - misses)
+                return UNKNOWN
+            target = table[slot][code]
+            if target == UNKNOWN:
+                target = self._transition(slot, code)
+            else:
+                recent.move_to_end(target)
+            slot = target
+        # every character that was not a miss was a cache hit
+        self._hits += len(s) - (self._misses - misses)
+        return slot
+
+    def advance_path(self, slot, s, path):
+        '''(LazyDFA, int, str, list of int) -> int
+
+        Like advance, but also appends to path the slot the DFA is in after
+        each character of s.
+
+        >>> dfa = LazyDFA(StarTree(DotTree(Leaf('0'), Leaf('1'))))
+        >>> path = []
+        >>> [dfa.is_accepting(dfa.advance_path(dfa.start(), '010', path))]
+        [False]
+        >>> [dfa.is_accepting(slot) for slot in path]
+        [False, True, False]
+        '''
+        # looking these up once instead of on every character
+        table = self._table
+        codes = SYMBOL_CODES
+        recent = self._recent
+        append = path.append
+        hits = 0
+        for char in s:
+            code = codes.get(char)
+            if slot == UNKNOWN or code is None:
+                slot = UNKNOWN
+            else:
+                target = table[slot][code]
+                if target == UNKNOWN:
+                    target = self._transition(slot, code)
+                else:
+                    recent.move_to_end(target)
+                    hits += 1
+                slot = target
+            append(slot)
+        # characters after an unknown symbol are not looked up at all
+        self._hits += hits
+        return slot
+
+    def get_evictions(self):
+        '''(LazyDFA) -> int
+
+        Return the number of states evicted so far. Slots are only reused
+        after an eviction, so a slot held on to is still the same state as
+        long as this number has not changed.
+        '''
+        return self._evictions
+
+    def is_accepting(self, slot):
+        '''(LazyDFA, int) -> bool
+
+        Return whether the state in slot accepts (UNKNOWN never accepts)
+        '''
+        return slot != UNKNOWN and self._accepting[slot]
+
+    def is_dead(self, slot):
+        '''(LazyDFA, int) -> bool
+
+        Return whether no string read from the state in slot can ever be
+        accepted (which is always so for UNKNOWN)
+
+        >>> dfa = LazyDFA(DotTree(Leaf('0'), Leaf('1')))
+        >>> [dfa.is_dead(dfa.advance(dfa.start(), s)) for s in ['0', '1']]
+        [False, True]
+        '''
+        # no NFA states left means nothing more can be matched
+        return slot == UNKNOWN or not self._keys[slot]
+
+    def match(self, s):
+        '''(LazyDFA, str) -> bool
+
+        Return whether s matches the RegexTree this DFA was built from.
+
+        >>> dfa = LazyDFA(StarTree(BarTree(Leaf('0'), Leaf('1'))))
+        >>> dfa.match('010110100101010')
+        True
+        >>> dfa.match('0102001010')
+        False
+        >>> dfa.match('')
+        True
+        >>> dfa = LazyDFA(DotTree(StarTree(Leaf('1')), Leaf('0')), 2)
+        >>> [dfa.match(s) for s in ['0', '10', '110', '01', '1']]
+        [True, True, True, False, False]
+        >>> dfa.get_stats()['evictions'] > 0
+        True
+        '''
+        return self.is_accepting(self.advance(self.start(), s))
+
+
+def build_dfa_table(r):
+    '''(RegexTree) -> tuple of (list of list of int, list of bool)
+
+    Builds the whole DFA for the RegexTree rooted at r up front, and returns
+    its transition table (one row per state, one column per symbol of
+    ALPHABET) and whether each state accepts. State 0 is the start state.
+    Unlike LazyDFA, every reachable state is built, which can take a lot of
+    time and memory for some trees. The DFA is not minimized, so two states
+    may behave the same.
+
+    REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+
+    >>> table, accepting = build_dfa_table(DotTree(StarTree(Leaf('1')),
+    ...                                            Leaf('0')))
+    >>> table
+    [[1, 2, 3], [3, 3, 3], [1, 2, 3], [3, 3, 3]]
+    >>> accepting
+    [False, True, False, False]
+    '''
+    nfa = compile_nfa(r)
+    # the set of NFA states of every DFA state, and the number of each set
+    keys = [nfa.initial()]
+    numbers = {keys[0]: 0}
+    table = []
+    # the rows are filled in the order the states were found
+    while len(table) < len(keys):
+        key = keys[len(table)]
+        row = []
+        for symbol in ALPHABET:
+            target = nfa.step(key, symbol)
+            if target not in numbers:
+                numbers[target] = len(keys)
+                keys.append(target)
+            row.append(numbers[target])
+        table.append(row)
+    return table, [nfa.get_accept() in key for key in keys]
+
+
+def match_many(r, strings, chunk_size=4096, max_states=1024):
+    '''(RegexTree, iterable of str[, int, int]) -> generator of bool
+
+    Yields, in order, whether each string of strings matches the RegexTree
+    rooted at r. The tree is only compiled once (into a LazyDFA keeping at most
+    max_states states), and strings are read chunk_size at a time and walked
+    in sorted order, so the prefix a string shares with the one before it
+    (as in a trie) is only walked once.
+
+    REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+    REQ: chunk_size >= 1
+
+    >>> tree = DotTree(StarTree(Leaf('1')), BarTree(Leaf('0'), Leaf('2')))
+    >>> list(match_many(tree, ['110', '1112', '11', '', '0', '113']))
+    [True, True, False, False, True, False]
+    '''
+    dfa = LazyDFA(r, max_states)
+    chunk = []
+    for s in strings:
+        chunk.append(s)
+        if len(chunk) == chunk_size:
+            for result in match_chunk(dfa, chunk):
+                yield result
+            chunk = []
+    for result in match_chunk(dfa, chunk):
+        yield result
+
+
+def match_chunk(dfa, chunk):
+    '''(LazyDFA, list of str) -> list of bool
+
+    Returns whether each string in chunk is accepted by dfa. The strings are
+    walked in sorted order, keeping the state reached after every prefix of
+    the last string walked, so a prefix shared with it is not walked again.
+
+    >>> dfa = LazyDFA(StarTree(DotTree(Leaf('0'), Leaf('1'))))
+    >>> match_chunk(dfa, ['0101', '01', '010', '2'])
+    [True, True, False, False]
+    '''
+    results = [False] * len(chunk)
+    # path[k] is the state reached after the first k characters of previous
+    previous = ''
+    path = [dfa.start()]
+    evictions = dfa.get_evictions()
+    for i in sorted(range(len(chunk)), key=chunk.__getitem__):
+        s = chunk[i]
+        # the length of the prefix s shares with the previous string (in
+        # sorted order, the previous string is often all of that prefix)
+        if s.startswith(previous):
+            shared = len(previous)
+        else:
+            # s sorts after previous, so they differ before either ends
+            shared = 0
+            while s[shared] == previous[shared]:
+                shared += 1
+        # states saved before an eviction may have had their slots reused
+        if dfa.get_evictions() != evictions:
+            evictions = dfa.get_evictions()
+            shared = 0
+            path = [dfa.start()]
+        del path[shared + 1:]
+        results[i] = dfa.is_accepting(
+            dfa.advance_path(path[-1], s[shared:], path))
+        previous = s
+    return results
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,239 @@
+'''
+A compact, array backed representation of a RegexTree. Instead of one Python
+object (and one children list) per node, a FlatRegexTree keeps three parallel
+arrays holding an opcode and the indexes of the left and right child of every
+node. Nodes are stored children first, so the root is always the last node.
+'''
+import sys
+from array import array
+from regextree import StarTree, DotTree, BarTree, Leaf, SetLeaf
+
+# the opcode of each kind of node
+OP_ZERO = 0
+OP_ONE = 1
+OP_TWO = 2
+OP_E = 3
+OP_STAR = 4
+OP_BAR = 5
+OP_DOT = 6
+# there are only four possible SetLeafs, so each gets its own opcode
+OP_SET_01 = 7
+OP_SET_02 = 8
+OP_SET_12 = 9
+OP_SET_012 = 10
+# the symbol of every opcode, and the opcode of every symbol
+OP_SYMBOLS = ('0', '1', '2', 'e', '*', '|', '.', '01', '02', '12', '012')
+SYMBOL_OPS = {'0': OP_ZERO, '1': OP_ONE, '2': OP_TWO, 'e': OP_E,
+              '*': OP_STAR, '|': OP_BAR, '.': OP_DOT, '01': OP_SET_01,
+              '02': OP_SET_02, '12': OP_SET_12, '012': OP_SET_012}
+# used for the child indexes a node does not have
+NO_CHILD = -1
+
+
+class FlatRegexTree:
+    '''A RegexTree stored as parallel arrays of opcodes, left child indexes
+    and right child indexes (the only child of a star is its left child).
+    '''
+    __slots__ = ('_ops', '_lefts', '_rights')
+
+    def __init__(self, ops, lefts, rights):
+        '''(FlatRegexTree, array, array, array) -> NoneType
+
+        A new FlatRegexTree made of the nodes described by ops, lefts and
+        rights, where every child comes before its parent.
+
+        REQ: ops, lefts and rights must have the same length of at least 1
+        '''
+        self._ops = ops
+        self._lefts = lefts
+        self._rights = rights
+
+    def __len__(self):
+        '''(FlatRegexTree) -> int
+
+        Return the number of nodes in this tree
+        '''
+        return len(self._ops)
+
+    def __eq__(self, other):
+        '''(FlatRegexTree, object) -> bool
+
+        Return whether FlatRegexTree self has the same nodes as other
+        '''
+        return (isinstance(other, FlatRegexTree) and
+                self._ops == other._ops and
+                self._lefts == other._lefts and
+                self._rights == other._rights)
+
+    def __repr__(self):
+        '''(FlatRegexTree) -> str
+
+        Return string representation of this FlatRegexTree
+        '''
+        return 'FlatRegexTree({}, {}, {})'.format(
+            repr(self._ops), repr(self._lefts), repr(self._rights))
+
+    def get_root(self):
+        '''(FlatRegexTree) -> int
+
+        Return the index of the root node
+        '''
+        return len(self._ops) - 1
+
+    def get_op(self, node):
+        '''(FlatRegexTree, int) -> int
+
+        Return the opcode of the node at index node
+        '''
+        return self._ops[node]
+
+    def get_symbol(self, node):
+        '''(FlatRegexTree, int) -> str
+
+        Return the regex symbol of the node at index node
+        '''
+        return OP_SYMBOLS[self._ops[node]]
+
+    def get_left(self, node):
+        '''(FlatRegexTree, int) -> int
+
+        Return the index of the left (or only) child of node, or NO_CHILD
+        '''
+        return self._lefts[node]
+
+    def get_right(self, node):
+        '''(FlatRegexTree, int) -> int
+
+        Return the index of the right child of node, or NO_CHILD
+        '''
+        return self._rights[node]
+
+    def get_arrays(self):
+        '''(FlatRegexTree) -> tuple of array
+
+        Return the (opcode, left child, right child) arrays of this tree
+        '''
+        return self._ops, self._lefts, self._rights
+
+    def nbytes(self):
+        '''(FlatRegexTree) -> int
+
+        Return the number of bytes taken up by this tree and its arrays
+        '''
+        return (sys.getsizeof(self) + sys.getsizeof(self._ops) +
+                sys.getsizeof(self._lefts) + sys.getsizeof(self._rights))
+
+
+def flatten(r):
+    '''(RegexTree) -> FlatRegexTree
+
+    Returns the FlatRegexTree for the RegexTree rooted at r. The tree is
+    walked with an explicit stack, so any depth of tree can be flattened.
+
+    REQ: r must be a valid RegexTree
+
+    >>> flatten(DotTree(StarTree(Leaf('1')), Leaf('e')))
+    FlatRegexTree(array('b', [1, 4, 3, 6]), array('i', [-1, 0, -1, 1]), \
+array('i', [-1, -1, -1, 2]))
+    '''
+    ops = array('b')
+    lefts = array('i')
+    rights = array('i')
+    # the indexes of the flattened subtrees waiting for their parent
+    done = []
+    to_flatten = [(r, False)]
+    while to_flatten:
+        node, children_done = to_flatten.pop()
+        children = node.get_children()
+        if children and not children_done:
+            to_flatten.append((node, True))
+            for child in reversed(children):
+                to_flatten.append((child, False))
+        else:
+            left = right = NO_CHILD
+            if len(children) == 2:
+                right = done.pop()
+                left = done.pop()
+            elif len(children) == 1:
+                left = done.pop()
+            ops.append(SYMBOL_OPS[node.get_symbol()])
+            lefts.append(left)
+            rights.append(right)
+            done.append(len(ops) - 1)
+    return FlatRegexTree(ops, lefts, rights)
+
+
+def unflatten(flat):
+    '''(FlatRegexTree) -> RegexTree
+
+    Returns a RegexTree made of Leaf, SetLeaf, StarTree, BarTree and DotTree
+    nodes that is equivalent to flat.
+
+    >>> tree = BarTree(DotTree(Leaf('0'), Leaf('1')), StarTree(Leaf('2')))
+    >>> unflatten(flatten(tree)) == tree
+    True
+    '''
+    ops, lefts, rights = flat.get_arrays()
+    # every child comes before its parent, so one pass builds them all
+    nodes = []
+    for i in range(len(ops)):
+        op = ops[i]
+        if op == OP_STAR:
+            nodes.append(StarTree(nodes[lefts[i]]))
+        elif op == OP_BAR:
+            nodes.append(BarTree(nodes[lefts[i]], nodes[rights[i]]))
+        elif op == OP_DOT:
+            nodes.append(DotTree(nodes[lefts[i]], nodes[rights[i]]))
+        elif op >= OP_SET_01:
+            nodes.append(SetLeaf(OP_SYMBOLS[op]))
+        else:
+            nodes.append(Leaf(OP_SYMBOLS[op]))
+    return nodes[-1]
+
+
+def tree_nbytes(r):
+    '''(RegexTree) -> int
+
+    Returns the number of bytes taken up by the nodes of the RegexTree rooted
+    at r, counting each node object, its __dict__ (if it has one) and its
+    children list. Shared subtrees are only counted once.
+
+    REQ: r must be a valid RegexTree
+    '''
+    total = 0
+    # nodes already counted, by id
+    seen = set()
+    to_count = [r]
+    while to_count:
+        node = to_count.pop()
+        if id(node) not in seen:
+            seen.add(id(node))
+            total += sys.getsizeof(node) + sys.getsizeof(node.get_children())
+            if hasattr(node, '__dict__'):
+                total += sys.getsizeof(node.__dict__)
+            to_count.extend(node.get_children())
+    return total
+
+
+def bytes_per_node(r):
+    '''(RegexTree) -> tuple of (float, float)
+
+    Returns the average number of bytes per node taken up by the RegexTree
+    rooted at r, and by its FlatRegexTree.
+
+    REQ: r must be a valid RegexTree
+    '''
+    flat = flatten(r)
+    return tree_nbytes(r) / len(flat), flat.nbytes() / len(flat)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    # a tree with 100001 nodes: ((((0.(1|2*)).(1|2*)).(1|2*))...)
+    tree = Leaf('0')
+    for i in range(20000):
+        tree = DotTree(tree, BarTree(Leaf('1'), StarTree(Leaf('2'))))
+    objects, flat = bytes_per_node(tree)
+    print('RegexTree objects: {:.1f} bytes per node'.format(objects))
+    print('FlatRegexTree:     {:.1f} bytes per node'.format(flat))
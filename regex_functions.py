@@ -1,6 +1,29 @@
 # Do not change this import statement, or add any of your own!
 from regextree import RegexTree, StarTree, DotTree, BarTree, Leaf
 
+# the characters that can be leaves of a regex
+LEAF_CHARS = '012e'
+# every character that can be part of a regex
+REGEX_CHARS = '012e|.*()'
+# the fewest nodes a tree needs before regex_match interns it
+INTERN_MIN_NODES = 32
+# the most nodes a subtree can have for find_ends to recurse into it
+RECURSE_MAX_NODES = 32
+
+
+class RegexParseError(ValueError):
+    '''Raised by parse when a string is not a valid regex'''
+    def __init__(self, message, position):
+        '''(RegexParseError, str, int) -> NoneType
+
+        A new RegexParseError explaining what is wrong (message) and at which
+        index of the string (position)
+        '''
+        ValueError.__init__(self, '{} at index {}'.format(message, position))
+        self.message = message
+        self.position = position
+
+
 def is_regex(s):
     '''(string) -> Boolean
     checks if the given string is a valid regex or not and returns a boolean
@@ -9,6 +32,8 @@ def is_regex(s):
     1. r1 + '*' is also a valid regex where r1 is a valid regex
     2. '(' + r1 '|' + r2 + ')' where r1 and r2 are valid regex's
     3. '(' + r1 '.' + r2 + ')' where r1 and r2 are valid regex's
+    This is a thin wrapper around regex_error, which also finds where s stops
+    being a valid regex.
 
     REQ: s must be a string
 
@@ -47,55 +72,76 @@ def is_regex(s):
     >>> is_regex('(e*.(2|1)*).(1|(0.1))')
     False
     '''
-    # a list containing the basic regex's
-    basic_regex = ['0', '1', '2', 'e', '0*', '1*', '2*', 'e*']
-    # a list containing both possible symbols
-    symbols_regex = ['|', '.']
-    # to keep track of the number of symbols in s
-    sybols_count = 0
-    # to keep track of the number of brackets (opened and closed) in s
-    brackets_count = 0
-    # counts all the symbols in string s
-    sybols_count = s.count('|') + s.count('.')
-    # counts all the brackets in string s
-    brackets_count = s.count('(') + s.count(')')
-    # if the number of brackets corresponding to the number of symbols do not
-    # match, s is not a valid regex (since each symbols NEEDS 2 brackets with
-    # it)
-    if (sybols_count * 2) != brackets_count:
-        s = False
-    # if a closed bracket is found before and open bracket
-    elif s.find('(') > s.find(')'):
-        s = False
-    # if the string is empty
-    elif len(s) == 0:
-        s = False
-    # if the string is one of the elements in basic_regex, then this is a valid
-    # regex
-    elif s in basic_regex:
-        s = True
-    # if there is a star at the end of s, the entirety of s is valid is s[:-1]
-    # (ie: s without the star) is also valid (as per rules of valid regex's)
-    elif s[-1] == '*':
-        # checks if everything before the * is a valid regex
-        s = is_regex(s[:-1])
-    # if the regex is enclosed in brackets (ie: has nested regex's)
-    elif s[0] == '(' and s[-1] == ')':
-        # need to see if the sub regex's are also valid
-        s = sub_regexs(s)
-    # other wise s is false
-    else:
-        s = False
+    # s is valid when a single pass over it finds no error (see regex_error)
+    return regex_error(s) == -1
 
-    # return whether s is valid or not
-    return s
+
+def regex_error(s):
+    '''(string) -> int
+
+    Checks s against the rules for valid regexs given in is_regex in a single
+    left to right pass, and returns the index of the first character of s
+    that can not be part of a valid regex, len(s) if s ends before the regex
+    is complete, or -1 if s is a valid regex. Instead of recursing into the
+    sub regexs, an explicit stack holds one entry per bracket that is still
+    open, recording whether its '|' or '.' has been seen yet, so this takes
+    O(len(s)) time no matter how deeply s is nested.
+
+    REQ: s must be a string
+
+    >>> regex_error('((e**.(2|1)*).(1|(0.1)))')
+    -1
+    >>> regex_error('2*1')
+    2
+    >>> regex_error('(0|1')
+    4
+    >>> regex_error('(0|1.2)')
+    4
+    >>> regex_error('')
+    0
+    '''
+    # for each bracket still open, whether its operator has been seen yet
+    open_brackets = []
+    # whether the characters so far end with a complete regex (otherwise a
+    # new regex has to start at the next character)
+    after_regex = False
+    # the index of the first error found
+    error = -1
+    index = 0
+    while error == -1 and index < len(s):
+        char = s[index]
+        # a new regex is either a leaf or starts with a bracket
+        if not after_regex:
+            if char in LEAF_CHARS:
+                after_regex = True
+            elif char == '(':
+                open_brackets.append(False)
+            else:
+                error = index
+        # a complete regex can be starred any number of times
+        elif char == '*':
+            pass
+        # the left regex of a bracket is complete, so its operator follows
+        elif char in '|.' and open_brackets and not open_brackets[-1]:
+            open_brackets[-1] = True
+            after_regex = False
+        # the right regex of a bracket is complete, so the bracket can close
+        elif char == ')' and open_brackets and open_brackets[-1]:
+            open_brackets.pop()
+        else:
+            error = index
+        index += 1
+    # s can only end after a complete regex, with every bracket closed
+    if error == -1 and (open_brackets or not after_regex):
+        error = len(s)
+    return error
 
 
 def sub_regexs(s):
     '''(string) -> boolean
 
-    This function checks the sub regex's within s are valid using indirect
-    recursion with is_regex() (ie: a regex ((0|1).(1|2)) well need its inner
+    This function checks the sub regex's within s are valid using
+    is_regex() (ie: a regex ((0|1).(1|2)) well need its inner
     parts to be evaluated as valid if the whole is to be evaluated as a
     valid regex). If NO open and closing brackets are found at the end and
     beginning of s, False will be returned regardless of whether s is a valid
@@ -155,11 +201,10 @@ def all_regex_permutations(s):
     2. '(' + r1 '|' + r2 + ')' where r1 and r2 are valid regex's
     3. '(' + r1 '.' + r2 + ')' where r1 and r2 are valid regex's
     4. '0' or '1' or '2' or 'e'
-    Length of s must be less that 15 or else, the program will crash due to
-    lack of sufficient memory.
+    Only valid regexs are ever built (see generate_regexes), so the time taken
+    depends on how many valid permutations there are rather than on len(s)!
 
     REQ: s must be a string
-    REQ: s < 12
 
     >>> all_regex_permutations('sfsdfds34234())09')
     set()
@@ -181,33 +226,272 @@ def all_regex_permutations(s):
     '((1.0)*|1)', '(1|(0.1*))', '(1.(1|0)*)', '(0.(1|1)*)', '(1*.(1|0))',
     '((1|1).0*)', '((0*|1).1)', '(1.(0|1*))', '((1|0)*.1)', '(0|(1.1))*'}
     '''
-    # a list containing the basic regex's
-    basic_regex = ['0', '1', '2', 'e']
-    # a list containing both possible symbols
-    symbols_regex = ['|', '.', '*', '(', ')']
-    # used to check if the expression is invalid or not
-    invalid = False
-    # checks each character of s
+    # every valid regex made from the characters of s (none if s contains a
+    # character that can not be part of a regex)
+    return set(generate_regexes(s))
+
+
+def regex_counts(s):
+    '''(string) -> tuple of int
+
+    Returns how many of each regex character s contains, in the order given by
+    REGEX_CHARS, as a tuple (n0, n1, n2, ne, bars, dots, stars). None is
+    returned if s contains a character that is not in REGEX_CHARS, or if its
+    characters could never be arranged into a valid regex (each '|' or '.'
+    needs one '(' and one ')', and there is one more leaf than operators).
+
+    REQ: s must be a string
+
+    >>> regex_counts('(1*.(1|0))')
+    (1, 2, 0, 0, 1, 1, 1)
+    >>> regex_counts('(1|0') is None
+    True
+    >>> regex_counts('13') is None
+    True
+    '''
+    # the number of times each regex character appears in s
+    counts = {}
+    for char in REGEX_CHARS:
+        counts[char] = 0
     for char in s:
-        # checks if the current char is not a valid regex character (outlined
-        # in basic_regex and symbols_regex)
-        if char not in basic_regex and char not in symbols_regex:
-            # empty list because there are not valid string
-            actual = []
-            invalid = True
-    if not(invalid):
-        # finds all possible permutations of s
-        permutations = get_combinations(list(s))
-        # a list to represent all valid regexs
-        actual = []
-        # runs for each permutations
-        for i in range(len(permutations)):
-            # if the current permutation is a regex
-            if is_regex(permutations[i]):
-                # append it to the list
-                actual.append(permutations[i])
-    # return the set of all valid expressions
-    return set(actual)
+        # a character that can not be part of a regex
+        if char not in counts:
+            return None
+        counts[char] += 1
+    leaves = counts['0'] + counts['1'] + counts['2'] + counts['e']
+    operators = counts['|'] + counts['.']
+    # the numbers of brackets, operators and leaves have to line up
+    if not (counts['('] == counts[')'] == operators and
+            leaves == operators + 1):
+        return None
+    return (counts['0'], counts['1'], counts['2'], counts['e'],
+            counts['|'], counts['.'], counts['*'])
+
+
+def leaf_splits(leaves, size):
+    '''(tuple of int, int) -> generator of tuple of int
+
+    Yields every way of picking size leaves out of leaves (a tuple holding how
+    many of each leaf there are), as a tuple of how many of each are picked.
+
+    >>> list(leaf_splits((1, 2), 2))
+    [(0, 2), (1, 1)]
+    >>> list(leaf_splits((1, 0), 2))
+    []
+    '''
+    if len(leaves) == 0:
+        # every leaf must have been picked by now
+        if size == 0:
+            yield ()
+    else:
+        # pick some of the first kind of leaf, and the rest from the others
+        for first in range(min(leaves[0], size) + 1):
+            for rest in leaf_splits(leaves[1:], size - first):
+                yield (first,) + rest
+
+
+def regex_splits(key):
+    '''(tuple of int) -> generator of tuple
+
+    Yields every way the characters counted by key (as returned by
+    regex_counts) can be split at the top of a regex of the form
+    '(' + r1 + op + r2 + ')' + '*' * stars. Each split is a tuple
+    (stars, op, left_key, right_key), where left_key and right_key count the
+    characters making up r1 and r2. Distinct splits never build the same
+    regex, since a valid regex can only be read in one way.
+
+    REQ: key must count at least one '|' or '.'
+
+    >>> splits = list(regex_splits((1, 1, 0, 0, 1, 0, 0)))
+    >>> len(splits)
+    2
+    >>> splits[0]
+    (0, '|', (0, 1, 0, 0, 0, 0, 0), (1, 0, 0, 0, 0, 0, 0))
+    >>> splits[1]
+    (0, '|', (1, 0, 0, 0, 0, 0, 0), (0, 1, 0, 0, 0, 0, 0))
+    '''
+    leaves, bars, dots, stars = key[:4], key[4], key[5], key[6]
+    # the operators at the top of the regex that are actually available
+    operators = []
+    if bars > 0:
+        operators.append(('|', bars - 1, dots))
+    if dots > 0:
+        operators.append(('.', bars, dots - 1))
+    # stars on the very outside of the regex
+    for top_stars in range(stars + 1):
+        for op, rest_bars, rest_dots in operators:
+            # the operators of r1; r2 gets all the others
+            for left_bars in range(rest_bars + 1):
+                for left_dots in range(rest_dots + 1):
+                    # r1 needs one more leaf than it has operators
+                    size = left_bars + left_dots + 1
+                    for left_leaves in leaf_splits(leaves, size):
+                        right_leaves = tuple(
+                            leaves[i] - left_leaves[i] for i in range(4))
+                        for left_stars in range(stars - top_stars + 1):
+                            yield (top_stars, op,
+                                   left_leaves + (left_bars, left_dots,
+                                                  left_stars),
+                                   right_leaves + (
+                                       rest_bars - left_bars,
+                                       rest_dots - left_dots,
+                                       stars - top_stars - left_stars))
+
+
+def build_regexes(key, memo):
+    '''(tuple of int, dict) -> list of string
+
+    Returns every valid regex made up of exactly the characters counted by key
+    (as returned by regex_counts). The regexs built for each key are saved in
+    memo, since the same sub regexs show up under many different splits.
+
+    REQ: key must be returned by regex_counts (or be part of a split of one)
+
+    >>> sorted(build_regexes((1, 1, 0, 0, 1, 0, 1), {}))
+    ['(0*|1)', '(0|1)*', '(0|1*)', '(1*|0)', '(1|0)*', '(1|0*)']
+    '''
+    if key not in memo:
+        leaves, stars = key[:4], key[6]
+        # no operators means a single leaf followed by all of the stars
+        if key[4] + key[5] == 0:
+            regexes = [LEAF_CHARS[leaves.index(1)] + '*' * stars]
+        else:
+            regexes = []
+            for top_stars, op, left_key, right_key in regex_splits(key):
+                right_regexes = build_regexes(right_key, memo)
+                for left in build_regexes(left_key, memo):
+                    for right in right_regexes:
+                        regexes.append(
+                            '(' + left + op + right + ')' + '*' * top_stars)
+        memo[key] = regexes
+    return memo[key]
+
+
+def generate_regexes(s):
+    '''(string) -> generator of string
+
+    Yields every distinct permutation of s that is a valid regex, exactly
+    once each, without looking at any permutation that is not a valid regex.
+    Nothing is yielded if s contains a character that can not be in a regex.
+
+    REQ: s must be a string
+
+    >>> sorted(generate_regexes('(1|0)'))
+    ['(0|1)', '(1|0)']
+    >>> list(generate_regexes('e**'))
+    ['e**']
+    >>> list(generate_regexes('((..))'))
+    []
+    '''
+    key = regex_counts(s)
+    if key is not None:
+        for regex in build_regexes(key, {}):
+            yield regex
+
+
+def count_regex_permutations(s):
+    '''(string) -> int
+
+    Returns the number of distinct permutations of s that are valid regexs,
+    which is len(all_regex_permutations(s)), without building any of them.
+    Only small tables of numbers are made, so the count can be found for
+    strings with far too many valid permutations to ever build.
+
+    REQ: s must be a string
+
+    >>> count_regex_permutations('(1*.(1|0))')
+    60
+    >>> count_regex_permutations('(1|0')
+    0
+    >>> count_regex_permutations('(((0.1)|2)*.e)**')
+    30240
+    >>> count_regex_permutations('(' * 20 + '0' * 21 + '.' * 20 + ')' * 20)
+    6564120420
+    '''
+    key = regex_counts(s)
+    if key is None:
+        return 0
+    return count_regexes(key)
+
+
+def count_regexes(key):
+    '''(tuple of int) -> int
+
+    Returns the number of valid regexs made up of exactly the characters
+    counted by key (as returned by regex_counts), that is
+    len(build_regexes(key, {})).
+
+    A valid regex can only be read in one way, so it is made of four choices
+    that do not depend on each other: the shape of its tree of operators
+    (see tree_shapes), which operator ('|' or '.') goes in each of the
+    operator spots in that tree, which leaf goes in each of the leaf spots,
+    and how many stars follow each of the nodes. Every combination of these
+    gives a different regex, so the count is the product of their counts.
+
+    REQ: key must be returned by regex_counts (or be part of a split of one)
+
+    >>> count_regexes((1, 1, 0, 0, 1, 0, 1))
+    6
+    >>> count_regexes((1, 0, 0, 0, 0, 0, 3))
+    1
+    '''
+    leaves, bars, dots, stars = key[:4], key[4], key[5], key[6]
+    operators = bars + dots
+    # the order of the leaves: a multinomial count, built from binomials
+    leaf_orders = 1
+    placed = 0
+    for count in leaves:
+        placed += count
+        leaf_orders *= choose(placed, count)
+    # every leaf and operator is a node that can be followed by stars
+    nodes = 2 * operators + 1
+    return (tree_shapes(operators)[operators] * choose(operators, bars) *
+            leaf_orders * choose(stars + nodes - 1, nodes - 1))
+
+
+def tree_shapes(operators):
+    '''(int) -> list of int
+
+    Returns a list whose item m is the number of different shapes a regex
+    with m operators (and so m + 1 leaves) can have, for every m from 0 up to
+    operators. Following the grammar, a regex with no operators is a leaf,
+    and one with m operators is '(' + r1 + op + r2 + ')' where r1 and r2
+    share the other m - 1 operators between them.
+
+    REQ: operators >= 0
+
+    >>> tree_shapes(5)
+    [1, 1, 2, 5, 14, 42]
+    '''
+    shapes = [1]
+    for total in range(1, operators + 1):
+        count = 0
+        # the number of operators r1 gets
+        for left in range(total):
+            count += shapes[left] * shapes[total - 1 - left]
+        shapes.append(count)
+    return shapes
+
+
+def choose(n, k):
+    '''(int, int) -> int
+
+    Returns the number of ways to pick k things out of n (0 if k > n)
+
+    REQ: n >= 0 and k >= 0
+
+    >>> choose(5, 2)
+    10
+    >>> choose(2, 5)
+    0
+    '''
+    if k > n:
+        return 0
+    result = 1
+    # result is choose(n - k + i, i) after each step
+    for i in range(1, min(k, n - k) + 1):
+        result = result * (n - min(k, n - k) + i) // i
+    return result
 
 
 def get_combinations(s):
@@ -262,6 +546,52 @@ def get_combinations(s):
     return combos
 
 
+def distinct_permutations(s):
+    '''(string) -> generator of string
+
+    Yields every distinct permutation of s exactly once, in lexicographic
+    order. Unlike get_combinations, the permutations are made one at a time
+    (by rearranging a single list of the characters of s in place) so only
+    one of them is ever held in memory, and repeated characters do not cause
+    repeated permutations. Like get_combinations, nothing is yielded for ''.
+
+    REQ: s must be a string
+
+    >>> list(distinct_permutations('bac'))
+    ['abc', 'acb', 'bac', 'bca', 'cab', 'cba']
+    >>> list(distinct_permutations('(()'))
+    ['(()', '()(', ')((']
+    >>> list(distinct_permutations(''))
+    []
+    '''
+    # the characters of s, starting from their smallest arrangement
+    chars = sorted(s)
+    # stays True until the largest arrangement has been yielded
+    more = len(chars) > 0
+    while more:
+        yield ''.join(chars)
+        # find the last position whose character is smaller than the next one
+        # (everything after it is already in its largest arrangement)
+        i = len(chars) - 2
+        while i >= 0 and chars[i] >= chars[i + 1]:
+            i -= 1
+        if i < 0:
+            more = False
+        else:
+            # swap in the smallest larger character from the end
+            j = len(chars) - 1
+            while chars[j] <= chars[i]:
+                j -= 1
+            chars[i], chars[j] = chars[j], chars[i]
+            # and put the end back into its smallest arrangement by
+            # reversing it in place
+            low, high = i + 1, len(chars) - 1
+            while low < high:
+                chars[low], chars[high] = chars[high], chars[low]
+                low += 1
+                high -= 1
+
+
 def regex_match(r, s):
     '''(RegexTree, string) -> boolean
 
@@ -278,6 +608,14 @@ def regex_match(r, s):
         concatination os s1 and s2 (s = s1 + s2) and r1 matches s1 and r2
         matches s2
 
+    A star of leaves (or of bars of leaves), like (0|1)*, matches exactly
+    the strings made of their symbols, which is checked directly. Any other
+    tree is matched by match_ends, which finds every index of s each
+    subtree can match up to from each start (rather than guessing the split
+    points of s) and remembers them so nothing is worked out twice. If a big
+    r repeats a subtree, it is interned first (see RegexTree.intern), so
+    the copies are the same node and share their answers too.
+
     REQ: r must be a valid RegexTree
     REQ: s must be a string
 
@@ -290,145 +628,346 @@ def regex_match(r, s):
     >>> regex_match(StarTree(BarTree(Leaf('0'), Leaf('1'))), '0102001010')
     False
     >>> regex_match(BarTree(DotTree(Leaf('0'), Leaf('1')), DotTree(Leaf('1'),
-    StarTree(Leaf('e')))), '01')
+    ... StarTree(Leaf('e')))), '01')
     True
     >>> regex_match(BarTree(DotTree(Leaf('0'), Leaf('1')), DotTree(Leaf('1'),
-    StarTree(Leaf('e')))), '1')
+    ... StarTree(Leaf('e')))), '1')
     True
     >>> regex_match(BarTree(DotTree(Leaf('0'), Leaf('1')), DotTree(Leaf('1'),
-    StarTree(Leaf('e')))), '1eeeeeeeee')
+    ... StarTree(Leaf('e')))), '1eeeeeeeee')
     False
+    >>> regex_match(StarTree(DotTree(Leaf('0'), StarTree(Leaf('1')))), '0101')
+    True
+    >>> regex_match(StarTree(DotTree(Leaf('0'), StarTree(Leaf('1')))), '0110')
+    True
+    '''
+    shortest, longest = r.get_length_bounds()
+    # r only matches strings of lengths between its bounds, and the empty
+    # string if the shortest string it matches is empty
+    if s == '' or not shortest <= len(s) <= longest:
+        matches = shortest <= len(s) <= longest
+    else:
+        symbols = star_symbols(r)
+        if symbols is not None:
+            # every character of s has to be one of the symbols
+            matches = not s.strip(symbols)
+        else:
+            # interning only pays off for trees big enough to be worth
+            # walking
+            if r.get_size() >= INTERN_MIN_NODES and repeats_subtree(r):
+                r = r.intern({})
+            matches = len(s) in match_ends(r, s, 0, {})
+    return matches
+
+
+def star_symbols(r):
+    '''(RegexTree) -> string
+
+    Returns the symbols (leaving out 'e') of the leaves under the RegexTree
+    rooted at r, if r is a star and everything under it is a bar, a star or a
+    leaf. Such a star matches exactly the strings made of those symbols.
+    Returns None for any other tree.
+
+    REQ: r must be a valid RegexTree
+
+    >>> star_symbols(StarTree(BarTree(Leaf('0'), StarTree(Leaf('2')))))
+    '20'
+    >>> star_symbols(StarTree(Leaf('e')))
+    ''
+    >>> star_symbols(StarTree(DotTree(Leaf('0'), Leaf('1')))) is None
+    True
+    '''
+    symbols = None
+    if r.get_symbol() == '*':
+        symbols = ''
+        to_check = [r.get_children()[0]]
+        while to_check and symbols is not None:
+            node = to_check.pop()
+            children = node.get_children()
+            # (r1|r2*)* matches the same strings as (r1|r2)*
+            if node.get_symbol() in '|*':
+                to_check.extend(children)
+            elif children:
+                symbols = None
+            elif node.get_symbol() != 'e':
+                symbols += node.get_symbol()
+    return symbols
+
+
+def match_ends(r, s, start, memo):
+    '''(RegexTree, string, int, dict) -> set of int
+
+    Returns the set of every index end of s such that s[start:end] is a
+    matching string to the given RegexTree (rooted at r), using the same
+    rules as regex_match. Every set found is saved in memo under (id of the
+    subtree, start), so no subtree is matched from the same start twice,
+    which makes this O(len(s) ** 3) per node of r in the worst case. A
+    subtree is not matched at all from a start too close to the end of s for
+    the shortest string it can match (see RegexTree.get_length_bounds). The
+    inner stars of r** are skipped, and a star of a leaf reaches the run of
+    its symbols right away, so nested stars match a long s in O(len(s)):
+
+    >>> nested = build_regex_tree('2************')
+    >>> 1000 in match_ends(nested, '2' * 1000, 0, {})
+    True
+    >>> 4000 in match_ends(build_regex_tree('1**'), '1' * 3999 + '0', 0, {})
+    False
+
+    REQ: r must be a valid RegexTree
+    REQ: 0 <= start <= len(s)
+    REQ: memo must be the same dict for every call made on the same s
+
+    >>> sorted(match_ends(DotTree(Leaf('0'), Leaf('1')), '2012', 1, {}))
+    [3]
+    >>> sorted(match_ends(StarTree(DotTree(Leaf('0'), StarTree(Leaf('1')))),
+    ...                   '0110210', 0, {}))
+    [0, 1, 2, 3, 4]
+    '''
+    ends = find_ends(r, s, start, memo, [])
+    if ends is None:
+        # every (subtree, start) still being worked out, kept on an explicit
+        # stack instead of recursing so that trees of any depth can be
+        # matched. Each also has the indices its star has reached and the
+        # next index to go on from, since a star is worked out bit by bit.
+        working = [(r, start, [{start}, start])]
+        while working:
+            node, node_start, progress = working[-1]
+            # the subtrees it needs that are not worked out yet
+            needed = []
+            find_ends(node, s, node_start, memo, needed, progress)
+            if needed:
+                for child, child_start in needed:
+                    working.append((child, child_start,
+                                    [{child_start}, child_start]))
+            else:
+                working.pop()
+        ends = memo[(id(r), start)]
+    return ends
+
+
+def find_ends(r, s, start, memo, needed, progress=None):
+    '''(RegexTree, string, int, dict, list[, list]) -> set of int
+
+    Returns the set of every index end of s such that s[start:end] matches
+    the RegexTree rooted at r, for match_ends, and saves it in memo. A tree
+    with at most RECURSE_MAX_NODES nodes is worked out by recursing, which
+    is quicker (and it is not deep enough to run out of stack). A bigger one
+    is only worked out if progress is given (it holds the indices its star
+    has reached and the next index to go on from, so that a star goes on
+    from where it got to last time); otherwise None is returned. Every
+    (child, start) it needs that is not worked out yet is added to needed,
+    in which case it returns None too.
+
+    REQ: r must be a valid RegexTree
+    REQ: 0 <= start <= len(s)
+
+    >>> find_ends(build_regex_tree('(1.1)*'), '0110', 1, {}, [])
+    {1, 3}
+    >>> big = build_regex_tree('(' * 20 + '1' + '.1*)' * 20)
+    >>> needed = []
+    >>> [find_ends(big, '0110', 1, {}, needed), needed]
+    [None, []]
+    >>> find_ends(big, '0110', 1, {}, needed, [{1}, 1]) is None
+    True
+    >>> len(needed)
+    1
     '''
-    # Base case; r is a leaf (ie: has no children)
-    if r.get_children() == []:
-        # if the leaf's sybmol is an 'e' (which matches too '')
+    children = r.get_children()
+    # 'e' matches the empty string, and any other leaf one of its symbols
+    # (there can be more than one in a SetLeaf)
+    if children == []:
         if r.get_symbol() == 'e':
-            # if s is a empty string
-            matches = ('' == s)
+            ends = {start}
+        elif start < len(s) and s[start] in r.get_symbol():
+            ends = {start + 1}
         else:
-            # checking is the symbol of the r matches to s (ie: 1 matches to 1)
-            matches = (r.get_symbol() == s)
+            ends = set()
+    elif start + r.get_length_bounds()[0] > len(s):
+        ends = set()
     else:
-        # getting the current symbol
-        symbol = r.get_symbol()
-        if symbol == '.':
-            # default boolean value
-            matches = False
-            # this loop is used to try to find an s1 and an s2 such that
-            # s1 + s2 match to r and r1 matches to s1; r2 matches to s2
-            for i in range(len(s)):
-                if matches is False:
-                    # this try catch is implemented to avoid any indexing
-                    # errors (s2 being an empty string and the very end of the
-                    # string)
-                    try:
-                        # if the left child is a Star tree
-                        if (len(s) == 1 and
-                                r.get_children()[0].get_symbol() == '*'):
-                            # if s is 1 and the left child is a Star tree then
-                            # s1 MUST be '' and s2 MUST be s
-                            matches = (regex_match(r.get_children()[0], '') and
-                                       regex_match(r.get_children()[1], s))
-                        # elif the right child is a Star tree
-                        elif (len(s) == 1 and
-                                r.get_children()[1].get_symbol() == '*'):
-                            # if s is 1 and the right child is a Star tree then
-                            # s1 MUST be s and s2 MUST be ''
-                            matches = (regex_match(r.get_children()[0], s) and
-                                       regex_match(r.get_children()[1], ''))
-                        else:
-                            # check if certain slicing's of s with the left
-                            # and right subtrees match to make s1 and s2. If
-                            # s1 and s2 are found such that matches is True
-                            # then the loop is stopped
-                            matches = (regex_match(
-                                r.get_children()[0], s[:i]) and
-                                       regex_match(
-                                           r.get_children()[1], s[i:]))
-                    except:
-                        # checking if s1 is s and s2 is '' (ie: got the end of
-                        # the list and matches was stil false)
-                        matches = (regex_match(r.get_children()[0], s) and
-                                   regex_match(r.get_children()[1], ''))
-        # if the symbol is a bar
-        elif symbol == '|':
-            # do a recursive call on the left and right children using an or
-            # statement (as per definition 3). If any one of the children match
-            # s, then then this too matches s
-            matches = regex_match(r.get_children()[0], s) or regex_match(
-                r.get_children()[1], s)
-        # if the symbol is a star
-        elif symbol == '*':
-            # a list containing the operators
-            symbol_regex = ['|', '.']
-            # a list containing the basic regex's
-            basic_regex = ['0', '1', '2', 'e']
-            # if s is empty (is a valid matching string to '*' as per
-            # definition 2)
-            if s == '':
-                matches = True
-            # if the next symbol is a bar
-            elif r.get_child().get_symbol() == symbol_regex[0]:
-                # default boolean; used in an initial comparison
-                matches = True
-                # checks each character of s
-                for base in s:
-                    # makes sure each character in s is a valid regex
-                    # (since the '*' operator indicates a repetition or
-                    # characters or an empty string)
-                    matches = matches and regex_match(r.get_child(), base)
-            # if there are no sub regex's (operators) in the current root
+        key = (id(r), start)
+        ends = memo.get(key)
+        if ends is None and (progress is not None or
+                             r.get_size() <= RECURSE_MAX_NODES):
+            ends = node_ends(r, s, start, memo, needed, progress)
+            if ends is not None:
+                memo[key] = ends
+    return ends
+
+
+def node_ends(r, s, start, memo, needed, progress):
+    '''(RegexTree, string, int, dict, list, list) -> set of int
+
+    Works out the set of every index end of s such that s[start:end]
+    matches the RegexTree rooted at r (which is not a leaf), for find_ends.
+    Every (child, start) it needs that is not worked out yet is added to
+    needed, and None is returned instead. progress is as for find_ends (or
+    None, if r is small enough to be worked out in one go).
+
+    REQ: r must be a valid RegexTree
+    REQ: 0 <= start <= len(s)
+
+    >>> needed = []
+    >>> node_ends(DotTree(Leaf('0'), build_regex_tree('(' * 20 + '1' +
+    ...           '.1*)' * 20)), '011', 0, {}, needed, None) is None
+    True
+    >>> len(needed)
+    1
+    '''
+    symbol = r.get_symbol()
+    children = r.get_children()
+    # the number of children that were needed before this one
+    were_needed = len(needed)
+    # a bar: the ends of either child
+    if symbol == '|':
+        ends = set()
+        for child in children:
+            child_ends = find_ends(child, s, start, memo, needed)
+            if child_ends is None:
+                needed.append((child, start))
             else:
-                # finding pattern of repitition
-                repitition = repitition_finder(s)
-                # check if the child of start matches the pattern of repitition
-                matches = regex_match(r.get_child(), repitition)
-        # if the symbol is a dot
+                ends.update(child_ends)
+    # a dot: the ends of the right child from every end of the left child
+    elif symbol == '.':
+        ends = set()
+        middles = find_ends(children[0], s, start, memo, needed)
+        if middles is None:
+            needed.append((children[0], start))
         else:
-            # if non of these cases apply then the tree rooted at r does not
-            # match
-            matches = False
+            for middle in middles:
+                child_ends = find_ends(children[1], s, middle, memo, needed)
+                if child_ends is None:
+                    needed.append((children[1], middle))
+                else:
+                    ends.update(child_ends)
+    # a star: every index that can be reached from start by matching the
+    # child to one non empty piece after another
+    else:
+        child = children[0]
+        # r** matches the same strings as r*, so the inner stars are
+        # skipped instead of being matched from every index of s
+        while child.get_symbol() == '*':
+            child = child.get_children()[0]
+        # a leaf reaches the run of its symbols that follows start
+        if child.get_children() == []:
+            run_end = start
+            if child.get_symbol() != 'e':
+                while run_end < len(s) and s[run_end] in child.get_symbol():
+                    run_end += 1
+            ends = range(start, run_end + 1)
+        else:
+            if progress is None:
+                progress = [{start}, start]
+            ends, piece_start = progress
+            # pieces are only matched from indices already reached, from
+            # left to right, so every index is gone on from at most once
+            while len(needed) == were_needed and piece_start < len(s):
+                if piece_start in ends:
+                    child_ends = find_ends(child, s, piece_start, memo,
+                                           needed)
+                    if child_ends is None:
+                        needed.append((child, piece_start))
+                    else:
+                        ends.update(child_ends)
+                        piece_start += 1
+                else:
+                    piece_start += 1
+            progress[1] = piece_start
+    if len(needed) > were_needed:
+        ends = None
+    return ends
 
-    return matches
+
+def repeats_subtree(r):
+    '''(RegexTree) -> boolean
+
+    Returns whether the RegexTree rooted at r might have two equivalent
+    subtrees that are not leaves (so that interning r would let them share
+    their answers in match_ends).
+
+    REQ: r must be a valid RegexTree
+
+    >>> repeats_subtree(DotTree(StarTree(Leaf('1')), Leaf('1')))
+    False
+    >>> repeats_subtree(DotTree(StarTree(Leaf('1')), StarTree(Leaf('1'))))
+    True
+    '''
+    # the hashes of the subtrees that are not leaves (equivalent subtrees
+    # have the same hash)
+    hashes = set()
+    repeated = False
+    to_check = [r]
+    while to_check and not repeated:
+        node = to_check.pop()
+        if node.get_children():
+            repeated = hash(node) in hashes
+            hashes.add(hash(node))
+            to_check.extend(node.get_children())
+    return repeated
 
 
 def repitition_finder(regex):
     '''(string) -> string
     This function takes in a string, regex and determines which part of the
     string is the repeating pattern. If no pattern is found then the original
-    regex will be returned
+    regex will be returned. The shortest pattern is found in O(len(regex))
+    time from the prefix function of regex (see prefix_function).
 
     REQ: regex must be a string
 
     >>> repitition_finder('abcabcabc')
     'abc'
-    >>> repitition_finder('0110001110101011000111010101100011101010110001110101
-    01100011101010110001110101')
+    >>> repitition_finder('0110001110101011000111010101100011101010110001'
+    ...                   '11010101100011101010110001110101')
     '0110001110101'
     >>> repitition_finder('abcxyz')
     'abcxyz'
+    >>> repitition_finder('abcab')
+    'abcab'
     >>> repitition_finder('')
     ''
     '''
-    # a var for the pattern of repition
-    pattern = ''
-    # used to see if a repeating pattern has been found
-    repitition_found = False
-    # runs for each character in regex
-    for base in regex:
-        if repitition_found is False:
-            # adding a new character to the possible pattern
-            pattern += base
-            # runs for the length of regex
-            for i in range(-1, len(regex)):
-                # in this part check if pattern can be turned into the original
-                # regex if so, the we have found the repitition pattner
-                if (pattern * (i + 1)) == regex:
-                    repitition_found = True
-    # returning the pattern of repitions
+    if regex == '':
+        return ''
+    # the shortest period of regex: the longest part that is both a proper
+    # prefix and a suffix of regex overlaps itself shifted by the period
+    period = len(regex) - prefix_function(regex)[-1]
+    # regex is only made of whole repetitions if the period divides it
+    if len(regex) % period == 0:
+        pattern = regex[:period]
+    else:
+        pattern = regex
     return pattern
 
 
+def prefix_function(s):
+    '''(string) -> list of int
+
+    Returns the prefix function of s (as used by the Knuth-Morris-Pratt
+    algorithm): item i is the length of the longest proper prefix of
+    s[:i + 1] that is also a suffix of it. This takes O(len(s)) time, since
+    each step can only shorten the match by as much as earlier steps
+    lengthened it.
+
+    REQ: s must be a string
+
+    >>> prefix_function('abcabcab')
+    [0, 0, 0, 1, 2, 3, 4, 5]
+    >>> prefix_function('aabaaab')
+    [0, 1, 0, 1, 2, 2, 3]
+    '''
+    prefix = [0] * len(s)
+    for i in range(1, len(s)):
+        # the longest border of s[:i] that might be extended by s[i]
+        length = prefix[i - 1]
+        while length > 0 and s[i] != s[length]:
+            length = prefix[length - 1]
+        if s[i] == s[length]:
+            length += 1
+        prefix[i] = length
+    return prefix
+
+
 def build_regex_tree(regex):
     '''(string) -> RegexTree
 
@@ -459,44 +998,241 @@ def build_regex_tree(regex):
     StarTree(StarTree(StarTree(StarTree(StarTree(StarTree(Leaf('2')))))))))))))
     True
     '''
-    # the basic regex's
-    basic_regex = ['0', '1', '2', 'e']
+    # where every bracket closes, and the main operator inside each bracket,
+    # worked out once so no part of regex has to be scanned again
+    index = bracket_index(regex)
+    # returning the root
+    return build_span(regex, 0, len(regex), index)
 
-    # base case; if the regex is a basic regex then create a Leaf object for it
-    if regex in basic_regex:
-        # creating the new leave
-        new_node = Leaf(regex)
 
-    else:
-        # getting the main operator ('|' , '.', or '*') and its index
-        info = find_operator_build_tree(regex)
-        # account for a special case like ((1.2).(1|0))*
-        if (regex[-1] == '*' and ((regex.count('.') + regex.count('|')) > 1)):
-            info = ['*', len(regex) - 1]
-        # seperating and assingning the info
-        operator, index = info[0], info[1]
-        # if the current operator is a dot
-        if operator == '.':
-            # create a DotTree with its left and right children
-            # being regex trees if everthing before and after the operator
-            # LEFT CHILD = everything before the operator
-            # RIGHT CHILD = evereything after the operator
-            new_node = DotTree(build_regex_tree(
-                regex[1:index]), build_regex_tree(regex[index + 1:-1]))
-        # if the current operator is a bar
-        elif operator == '|':
-            # create a BarTree with its left and right children
-            # being regex trees if everthing before and after the operator
-            new_node = BarTree(build_regex_tree(
-                regex[1:index]), build_regex_tree(regex[index + 1:-1]))
-        # if the current operator is a star
-        elif operator == '*':
-            # creat a StarTree and have its chilren be a regex tree of
-            # everything before the operator
-            regex = regex[:regex.rfind('*')]
-            new_node = StarTree(build_regex_tree(regex))
+def build_span(regex, start, end, index):
+    '''(string, int, int, tuple of (list of int, list of int)) -> RegexTree
+
+    Returns the regex tree of regex[start:end], using index (as returned by
+    bracket_index(regex)) to find the main operator of each part of regex
+    in O(1) instead of slicing and rescanning it. Parts still to be built are
+    kept on an explicit stack, so regexs nested to any depth can be built.
+
+    REQ: regex[start:end] must be a valid regex
+    REQ: index must be bracket_index(regex)
+
+    >>> regex = '((0.1)|1*)'
+    >>> build_span(regex, 1, 6, bracket_index(regex))
+    DotTree(Leaf('0'), Leaf('1'))
+    '''
+    operators = index[1]
+    # the trees built so far, in the order their parts appear in regex
+    built = []
+    # parts of regex still to be built, as (start, end), and operators whose
+    # two children are on top of built, as (operator, stars); both are kept
+    # on an explicit stack so regexs nested to any depth can be built
+    to_build = [(start, end)]
+    while to_build:
+        first, second = to_build.pop()
+        if isinstance(first, str):
+            # join the two children built for this operator
+            right = built.pop()
+            left = built.pop()
+            if first == '.':
+                new_node = DotTree(left, right)
+            else:
+                new_node = BarTree(left, right)
+            built.append(star_tree(new_node, second))
+        else:
+            # the stars on the end apply to everything before them
+            stars = 0
+            while regex[second - 1 - stars] == '*':
+                stars += 1
+            second -= stars
+            # base case; a basic regex becomes a Leaf object
+            if second - first == 1:
+                built.append(star_tree(Leaf(regex[first]), stars))
+            else:
+                # the main operator of the brackets from first to second
+                operator = operators[first]
+                to_build.append((regex[operator], stars))
+                # RIGHT CHILD = between the operator and the close bracket
+                to_build.append((operator + 1, second - 1))
+                # LEFT CHILD = between the open bracket and the operator
+                to_build.append((first + 1, operator))
     # returning the root
-    return new_node
+    return built.pop()
+
+
+def star_tree(r, stars):
+    '''(RegexTree, int) -> RegexTree
+
+    Returns the RegexTree r with stars StarTrees on top of it
+
+    REQ: stars >= 0
+
+    >>> star_tree(Leaf('1'), 2)
+    StarTree(StarTree(Leaf('1')))
+    '''
+    for i in range(stars):
+        r = StarTree(r)
+    return r
+
+
+def bracket_index(regex):
+    '''(string) -> tuple of (list of int, list of int)
+
+    This function goes through regex once and returns two lists as long as
+    regex: the first holds, for every bracket, the index of the bracket that
+    matches it, and the second holds, for every open bracket, the index of
+    the operator ('|' or '.') directly inside it. Every other entry is -1, as
+    are the entries of brackets or operators that have no match.
+
+    REQ: regex must be a string
+
+    >>> bracket_index('((0.1)|1)')
+    ([8, 5, -1, -1, -1, 1, -1, -1, 0], [6, 3, -1, -1, -1, -1, -1, -1, -1])
+    '''
+    matches = [-1] * len(regex)
+    operators = [-1] * len(regex)
+    # the indexes of the brackets that are still open
+    open_brackets = []
+    for i in range(len(regex)):
+        char = regex[i]
+        if char == '(':
+            open_brackets.append(i)
+        elif char == ')' and open_brackets:
+            # the most recent open bracket is the one closed here
+            opened = open_brackets.pop()
+            matches[opened] = i
+            matches[i] = opened
+        elif char in '|.' and open_brackets:
+            operators[open_brackets[-1]] = i
+    return matches, operators
+
+
+def to_regex_string(r):
+    '''(RegexTree) -> string
+
+    Returns the regex string of the RegexTree rooted at r, so that
+    build_regex_tree (or parse) of it gives back an equivalent tree. Since
+    the grammar has no sets of symbols, a SetLeaf is written as the bar of
+    its symbols. The tree is walked with an explicit stack and the pieces of
+    the string are joined once at the end, so this takes O(number of nodes)
+    time for trees of any depth.
+
+    REQ: r must be a valid RegexTree
+
+    >>> to_regex_string(DotTree(StarTree(Leaf('1')), Leaf('e')))
+    '(1*.e)'
+    >>> regex = '((e**.(2|1)*).(1|(0.1)))'
+    >>> to_regex_string(build_regex_tree(regex)) == regex
+    True
+    >>> tree = BarTree(StarTree(DotTree(Leaf('0'), Leaf('2'))), Leaf('e'))
+    >>> is_regex(to_regex_string(tree))
+    True
+    >>> build_regex_tree(to_regex_string(tree)) == tree
+    True
+    >>> regexes = all_regex_permutations('((0|e)*.(1.2)**)')
+    >>> all([to_regex_string(build_regex_tree(regex)) == regex
+    ...      for regex in regexes])
+    True
+    >>> len(to_regex_string(star_tree(Leaf('2'), 10000)))
+    10001
+    '''
+    pieces = []
+    # nodes still to be written, and pieces of text to write once the nodes
+    # before them are done
+    to_write = [r]
+    while to_write:
+        item = to_write.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+        else:
+            symbol = item.get_symbol()
+            children = item.get_children()
+            if children == []:
+                if len(symbol) == 1:
+                    pieces.append(symbol)
+                else:
+                    # a SetLeaf, as ((a|b)|c)
+                    pieces.append('(' * (len(symbol) - 1) + symbol[0])
+                    for char in symbol[1:]:
+                        pieces.append('|' + char + ')')
+            elif symbol == '*':
+                to_write.append('*')
+                to_write.append(children[0])
+            else:
+                pieces.append('(')
+                to_write.append(')')
+                to_write.append(children[1])
+                to_write.append(symbol)
+                to_write.append(children[0])
+    return ''.join(pieces)
+
+
+def parse(regex):
+    '''(string) -> RegexTree
+
+    This function checks that regex is valid and builds its regex tree in the
+    same single left to right pass over it, returning the same tree as
+    build_regex_tree. A RegexParseError (holding the index of the problem) is
+    raised if regex is not valid. Brackets that are still open are kept on an
+    explicit stack instead of recursing, so any depth of nesting works.
+
+    REQ: regex must be a string
+
+    >>> parse('(1*.e)')
+    DotTree(StarTree(Leaf('1')), Leaf('e'))
+    >>> parse('((0.1)|(1|e*))') == build_regex_tree('((0.1)|(1|e*))')
+    True
+    >>> parse('(0|1.2)')
+    Traceback (most recent call last):
+    ...
+    regex_functions.RegexParseError: expected '*' or ')' at index 4
+    >>> parse('2' + '*' * 10000).get_child().get_symbol()
+    '*'
+    '''
+    # for each bracket still open, its left regex and operator (both None
+    # until the operator has been seen)
+    open_brackets = []
+    # the complete regex that ends at the current character (None if a new
+    # regex has to start at the next character)
+    current = None
+    for index in range(len(regex)):
+        char = regex[index]
+        # a new regex is either a leaf or starts with a bracket
+        if current is None:
+            if char in LEAF_CHARS:
+                current = Leaf(char)
+            elif char == '(':
+                open_brackets.append([None, None])
+            else:
+                raise RegexParseError("expected '(' or a leaf", index)
+        # a complete regex can be starred any number of times
+        elif char == '*':
+            current = StarTree(current)
+        # the left regex of a bracket is complete, so its operator follows
+        elif (char in '|.' and open_brackets and
+                open_brackets[-1][1] is None):
+            open_brackets[-1] = [current, char]
+            current = None
+        # the right regex of a bracket is complete, so the bracket closes
+        elif (char == ')' and open_brackets and
+                open_brackets[-1][1] is not None):
+            left, operator = open_brackets.pop()
+            if operator == '|':
+                current = BarTree(left, current)
+            else:
+                current = DotTree(left, current)
+        # nothing else can follow a complete regex
+        elif open_brackets and open_brackets[-1][1] is None:
+            raise RegexParseError("expected '*', '|' or '.'", index)
+        elif open_brackets:
+            raise RegexParseError("expected '*' or ')'", index)
+        else:
+            raise RegexParseError("expected '*' or the end", index)
+    # the regex can only end once it is complete and every bracket is closed
+    if current is None:
+        raise RegexParseError("expected '(' or a leaf", len(regex))
+    if open_brackets:
+        raise RegexParseError("expected ')'", len(regex))
+    return current
 
 
 def find_operator(regex):
@@ -509,12 +1245,13 @@ def find_operator(regex):
     then an index of -1 and an operator '*' is provided (if an index of -1 is
     given then the false '*' returned won't matter). This version of
     find_operator gives priority to the operators '|' and '.' over '*'
-    (to certain cases outlined in the examples below)
+    (to certain cases outlined in the examples below). The brackets are
+    matched once by bracket_index, so this takes O(len(regex)) time.
 
     REQ: regex must be a string
 
     >>> find_operator('')
-    [*, -1]
+    ['*', -1]
     >>> find_operator('1')
     ['*', -1]
     >>> find_operator('1*')
@@ -532,165 +1269,24 @@ def find_operator(regex):
     >>> find_operator('(((e**.(2|1)*).(1|(0.1)))|((2***|0).(0*1*)****))')
     ['|', 25]
     >>> find_operator('(0.1)*')
-    ['.', 2] # The type of case that DIFFERS from find_operator_build_tree
+    ['.', 2]
     >>> find_operator('((0.1).(1|0))*')
     ['.', 6]
 
 
 
     '''
-    # the 2 main symbols that are being looked for
-    symbols_regex = ['|', '.']
-    # keeps track of all Open brackets
-    bracketO = []
-    # keeps track of all Closed brackets
-    bracketC = []
-    # so pop() is not done in the beggining (if bracketO is empty)
-    first = False
-    # only runs if there are open AND closed brackets
-    if '(' in regex and ')' in regex:
-        # if there are no inner brackets in regex, then the operator
-        # can be found (the outer brackets are ignored for this)
-        if not('(' in regex[1:-1]) and not(')' in regex[1:-1]):
-            # checking if a certaain symbol is in regex
-            if symbols_regex[0] in regex[1:-1]:
-                operator = '|'
-                index = regex.find('|')
-            else:
-                operator = '.'
-                index = regex.find('.')
-        else:
-            for i in range(1, len(regex[1:-1])):
-                # if an Open bracket is found as position i, it is appended
-                # to bracketO
-                if regex[i] == '(':
-                    bracketO.append('(')
-                # if a closed bracket it found
-                elif regex[i] == ')':
-                    # if this is not the very first iteration
-                    if first:
-                        # pops the open bracket from bracketO if a closed
-                        # bracket is found
-                        bracketO.pop()
-                # if there are no more brackets found in bracketO
-                # signals that the loop is no long inside of the sub regex
-                # (left or right child)
-                if len(bracketO) == 0:
-                    # if '*', '(' and ')' are not found in the regex
-                    if (not(regex[i] == '*') and
-                            not(regex[i] == '(') and not(regex[i] == ')')):
-                        # if any of the valid operators are in the regex after
-                        # the last closed bracket
-                        if (symbols_regex[0] in regex[i:] or
-                                symbols_regex[1] in regex[i:]):
-                            # saves the index
-                            index = i
-                            # saves the operator
-                            operator = regex[i]
-                # if the first iteration is done
-                first = True
-            # if none of the operators are in regex, and the loop has reached
-            # the end, then a '*' is returned
-            if not(operator in symbols_regex):
-                operator = '*'
-                index = regex.rfind('*')
-    else:
-        # if there are not brackets present('2*')
+    # the operator directly inside the bracket at the start of regex, if
+    # that bracket is only followed by stars
+    matches, operators = bracket_index(regex)
+    if (regex.startswith('(') and matches[0] == len(regex.rstrip('*')) - 1
+            and operators[0] != -1):
+        operator = regex[operators[0]]
+        index = operators[0]
+    # if there are brackets, but not around the main operator ('(e|1).')
+    elif '(' in regex or ')' in regex:
         operator = '*'
-        index = regex.find('*')
-    # returning the data as a list
-    return [operator, index]
-
-
-def find_operator_build_tree(regex):
-    ''' (string) -> list(string, index)
-
-    This function  takes in a string regex, finds the main operator acting
-    within it. Valid operators can either be '|', '*' or '.'. If there is no
-    valid operator found (ie: this function does however return the correct
-    values for some invalid regex's but that won't affect other code/output),
-    then an index of -1 and an operator '*' is provided (if an index of -1 is
-    given then the false '*' returned won't matter). This version of
-    find_operator does not give priority to any symbol
-
-    REQ: regex must be a string
-
-    >>> find_operator_build_tree('')
-    [*, -1]
-    >>> find_operator_build_tree('1')
-    ['*', -1]
-    >>> find_operator_build_tree('1*')
-    ['*', 1]
-    >>> find_operator_build_tree('(e|1)')
-    ['|', 2]
-    >>> find_operator_build_tree('(e|1).')
-    ['*', -1]
-    >>> find_operator_build_tree('((0|1).1)')
-    ['.', 6]
-    >>> find_operator_build_tree('(1*.(0|1).1)')
-    ['.', 9]
-    >>> find_operator_build_tree('((e**.(2|1)*).(1|(0.1)))')
-    ['.', 13]
-    >>> find_operator_build_tree('(((e**.(2|1)*).(1|(0.1)))|((2***|0).(
-    0*1*)****))')
-    ['|', 25]
-    >>> find_operator_build_tree('(0.1)*')
-    ['*', 5] # The type of case that DIFFERS from find_operator
-    >>> find_operator_build_tree('((0.1).(1|0))*')
-    ['.', 6]
-    '''
-    # the 2 main symbols that are being looked for
-    symbols_regex = ['|', '.']
-    # keeps track of all Open brackets
-    bracketO = []
-    # keeps track of all Closed brackets
-    bracketC = []
-    # so pop() is not done in the beggining (if bracketO is empty)
-    first = False
-    # only runs if there are open AND closed brackets
-    if '(' in regex and ')' in regex:
-        # if there are no inner brackets in regex, then the operator
-        # can be found (the outer brackets are ignored for this)
-        if not('(' in regex[1:-1]) and not(')' in regex[1:-1]):
-            # checking if a certaain symbol is in regex
-            if symbols_regex[0] in regex[1:-1]:
-                operator = '|'
-                index = regex.find('|')
-            else:
-                operator = '.'
-                index = regex.find('.')
-        else:
-            for i in range(1, len(regex[1:-1])):
-                # if an Open bracket is found as position i, it is appended
-                # to bracketO
-                if regex[i] == '(':
-                    bracketO.append('(')
-                # if a closed bracket it found
-                elif regex[i] == ')':
-                    # if this is not the very first iteration
-                    if first:
-                        # pops the open bracket from bracketO if a closed
-                        # bracket is found
-                        bracketO.pop()
-                # if there are no more brackets found in bracketO
-                # signals that the loop is no long inside of the sub regex
-                # (left or right child)
-                if len(bracketO) == 0:
-                    # if '*', '(' and ')' are not found in the regex
-                    if (not(regex[i] == '*') and
-                            not(regex[i] == '(') and not(regex[i] == ')')):
-                        # saving the index
-                        index = i
-                        # saving the operator
-                        operator = regex[i]
-                # if the first iteration is done
-                first = True
-            # if none of the operators are in regex, and the loop has reached
-            # the end, then a '*' is returned
-            if not(operator in symbols_regex):
-                operator = '*'
-                # r find is done to find the right most '*' (ie: '2*****')
-                index = regex.rfind('*')
+        index = -1
     else:
         # if there are not brackets present('2*')
         operator = '*'
@@ -0,0 +1,281 @@
+'''
+Compiles a RegexTree into a Thompson NFA and matches strings against it by
+keeping track of the set of NFA states that are currently active. Unlike
+regex_match (in regex_functions.py), this never has to guess split points
+of s, so matching costs O(len(s) * number of nodes in the tree).
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf
+
+
+class NFA:
+    '''A Thompson NFA. Every state either has a single transition on a
+    symbol or any number of epsilon (empty) transitions. There is exactly one
+    start state and exactly one accepting state.
+    '''
+    def __init__(self):
+        '''(NFA) -> NoneType
+
+        A new NFA with no states. States are added with add_state.
+        '''
+        # the symbol needed to leave each state (None for epsilon states)
+        self._symbols = []
+        # the state reached by reading the symbol of each state
+        self._targets = []
+        # the states reached from each state without reading anything
+        self._epsilons = []
+        # the start and accepting states (set by compile_nfa)
+        self._start = -1
+        self._accept = -1
+
+    def add_state(self, symbol=None, target=-1):
+        '''(NFA, str, int) -> int
+
+        Adds a new state to this NFA and returns its number. If symbol is
+        given, the new state moves to target when symbol is read.
+
+        >>> nfa = NFA()
+        >>> nfa.add_state()
+        0
+        >>> nfa.add_state('1', 0)
+        1
+        '''
+        self._symbols.append(symbol)
+        self._targets.append(target)
+        self._epsilons.append([])
+        return len(self._symbols) - 1
+
+    def add_epsilon(self, state, target):
+        '''(NFA, int, int) -> NoneType
+
+        Adds an epsilon transition from state to target.
+        '''
+        self._epsilons[state].append(target)
+
+    def set_ends(self, start, accept):
+        '''(NFA, int, int) -> NoneType
+
+        Makes start the start state and accept the accepting state of this NFA
+        '''
+        self._start = start
+        self._accept = accept
+
+    def get_start(self):
+        '''(NFA) -> int
+
+        Return the start state of this NFA
+        '''
+        return self._start
+
+    def get_accept(self):
+        '''(NFA) -> int
+
+        Return the accepting state of this NFA
+        '''
+        return self._accept
+
+    def get_symbol(self, state):
+        '''(NFA, int) -> str
+
+        Return the symbol needed to leave state (None for epsilon states)
+        '''
+        return self._symbols[state]
+
+    def get_target(self, state):
+        '''(NFA, int) -> int
+
+        Return the state reached by reading the symbol of state (-1 for
+        epsilon states)
+        '''
+        return self._targets[state]
+
+    def __len__(self):
+        '''(NFA) -> int
+
+        Return the number of states in this NFA
+        '''
+        return len(self._symbols)
+
+    def closure(self, states):
+        '''(NFA, iterable of int) -> frozenset of int
+
+        Return every state that can be reached from states using only epsilon
+        transitions (including the states themselves).
+        '''
+        # the states found so far
+        reached = set(states)
+        # the states whose epsilon transitions still need to be followed
+        to_visit = list(reached)
+        while to_visit:
+            # follow every epsilon transition of the next state
+            for target in self._epsilons[to_visit.pop()]:
+                # only visit states once, since stars make epsilon loops
+                if target not in reached:
+                    reached.add(target)
+                    to_visit.append(target)
+        return frozenset(reached)
+
+    def step(self, states, symbol):
+        '''(NFA, iterable of int, str) -> frozenset of int
+
+        Return the closure of all states reached by reading symbol from any of
+        the given states.
+        '''
+        # looking up the lists once instead of on every iteration
+        symbols = self._symbols
+        targets = self._targets
+        return self.closure(
+            [targets[state] for state in states if symbols[state] == symbol])
+
+    def initial(self):
+        '''(NFA) -> frozenset of int
+
+        Return the set of states active before any symbol is read
+        '''
+        return self.closure([self._start])
+
+    def match(self, s):
+        '''(NFA, str) -> bool
+
+        Return whether this NFA accepts all of s.
+
+        >>> compile_nfa(StarTree(Leaf('1'))).match('111')
+        True
+        >>> compile_nfa(StarTree(Leaf('1'))).match('110')
+        False
+        '''
+        # the states active after reading each character of s
+        states = self.initial()
+        for char in s:
+            states = self.step(states, char)
+            # once no state is active, no longer input can be accepted
+            if not states:
+                return False
+        return self._accept in states
+
+
+def compile_nfa(r):
+    '''(RegexTree) -> NFA
+
+    Compiles the RegexTree rooted at r into a Thompson NFA, which has at most
+    2 states per node of r, plus one for each symbol of every SetLeaf.
+
+    REQ: r must be a valid RegexTree
+
+    >>> len(compile_nfa(Leaf('1')))
+    2
+    >>> len(compile_nfa(DotTree(StarTree(Leaf('1')), Leaf('e'))))
+    6
+    '''
+    nfa = NFA()
+    nfa.set_ends(*add_tree(nfa, r))
+    return nfa
+
+
+def add_tree(nfa, r):
+    '''(NFA, RegexTree) -> tuple of (int, int)
+
+    Adds the states for the RegexTree rooted at r to nfa, and returns the
+    (start, end) states of the new fragment; the new states are not connected
+    to any state already in nfa. The tree is walked with an explicit stack
+    (children before parents) so deep trees, like the ones built from
+    '2************', do not use up Python's call stack.
+
+    REQ: r must be a valid RegexTree
+
+    >>> nfa = compile_nfa(Leaf('1'))
+    >>> add_tree(nfa, StarTree(Leaf('2')))
+    (4, 5)
+    '''
+    # the (start, end) states of the fragments built so far, in postorder
+    fragments = []
+    # nodes waiting to be compiled; the flag is True once the children of the
+    # node have already been compiled
+    to_compile = [(r, False)]
+    while to_compile:
+        node, children_done = to_compile.pop()
+        children = node.get_children()
+        # the children have to be compiled first (right child popped last so
+        # the left fragment ends up below the right one on fragments)
+        if children and not children_done:
+            to_compile.append((node, True))
+            for child in reversed(children):
+                to_compile.append((child, False))
+        # a leaf: one transition between two new states
+        elif not children:
+            end = nfa.add_state()
+            # 'e' matches the empty string, so no symbol is needed
+            if node.get_symbol() == 'e':
+                start = nfa.add_state()
+                nfa.add_epsilon(start, end)
+            # a SetLeaf: one transition for each of its symbols
+            elif len(node.get_symbol()) > 1:
+                start = nfa.add_state()
+                for symbol in node.get_symbol():
+                    nfa.add_epsilon(start, nfa.add_state(symbol, end))
+            else:
+                start = nfa.add_state(node.get_symbol(), end)
+            fragments.append((start, end))
+        # a star: loop back to the child's start, or skip it completely
+        elif node.get_symbol() == '*':
+            child_start, child_end = fragments.pop()
+            start = nfa.add_state()
+            end = nfa.add_state()
+            nfa.add_epsilon(start, child_start)
+            nfa.add_epsilon(start, end)
+            nfa.add_epsilon(child_end, child_start)
+            nfa.add_epsilon(child_end, end)
+            fragments.append((start, end))
+        # a bar: either one of the two children
+        elif node.get_symbol() == '|':
+            right_start, right_end = fragments.pop()
+            left_start, left_end = fragments.pop()
+            start = nfa.add_state()
+            end = nfa.add_state()
+            nfa.add_epsilon(start, left_start)
+            nfa.add_epsilon(start, right_start)
+            nfa.add_epsilon(left_end, end)
+            nfa.add_epsilon(right_end, end)
+            fragments.append((start, end))
+        # a dot: the left child followed by the right child
+        else:
+            right_start, right_end = fragments.pop()
+            left_start, left_end = fragments.pop()
+            nfa.add_epsilon(left_end, right_start)
+            fragments.append((left_start, right_end))
+    # the fragment left over is the whole tree
+    return fragments.pop()
+
+
+def nfa_match(r, s):
+    '''(RegexTree, str) -> bool
+
+    Returns whether or not s is a matching string to the given RegexTree
+    (rooted at r), using the same rules as regex_match but in
+    O(len(s) * size of r) time.
+
+    REQ: r must be a valid RegexTree
+    REQ: s must be a string
+
+    >>> nfa_match(StarTree(Leaf('1')), '111111111111111111111111111111')
+    True
+    >>> nfa_match(StarTree(BarTree(Leaf('0'), Leaf('1'))), '')
+    True
+    >>> nfa_match(StarTree(BarTree(Leaf('0'), Leaf('1'))), '010110100101010')
+    True
+    >>> nfa_match(StarTree(BarTree(Leaf('0'), Leaf('1'))), '0102001010')
+    False
+    >>> tree = BarTree(DotTree(Leaf('0'), Leaf('1')),
+    ...                DotTree(Leaf('1'), StarTree(Leaf('e'))))
+    >>> nfa_match(tree, '01')
+    True
+    >>> nfa_match(tree, '1')
+    True
+    >>> nfa_match(tree, '1eeeeeeeee')
+    False
+    '''
+    return compile_nfa(r).match(s)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
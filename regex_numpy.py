@@ -0,0 +1,129 @@
+'''
+Matches big batches of strings against a RegexTree at once using NumPy.
+Strings are encoded as rows of a 2-D uint8 array (one column per character)
+and the whole DFA of the tree is built up front, so reading one column for
+every string is a single fancy indexing lookup: state = table[state, column]
+(with the table flattened, so it is table[state + column]).
+
+This module needs NumPy, which the rest of the package does not.
+'''
+import numpy
+from regextree import StarTree, BarTree, Leaf
+from regex_dfa import ALPHABET, build_dfa_table
+
+# the codes used in an encoded batch, besides 0, 1 and 2 for the symbols of
+# ALPHABET: PAD fills the end of strings shorter than the batch is wide, and
+# INVALID stands for any character that is not in ALPHABET
+PAD = 3
+INVALID = 4
+# the number of different codes, and so of columns in the DFA table
+CODES = 5
+# the code of every byte value
+BYTE_CODES = numpy.full(256, INVALID, dtype=numpy.uint8)
+for code in range(len(ALPHABET)):
+    BYTE_CODES[ord(ALPHABET[code])] = code
+
+
+def encode(strings, width=None):
+    '''(list of str[, int]) -> numpy.ndarray
+
+    Returns a 2-D uint8 array with one row per string, holding the code of
+    each character of the string (0, 1 and 2 for '0', '1' and '2', INVALID
+    for anything else) followed by PAD up to width columns. width defaults
+    to the length of the longest string.
+
+    REQ: width must be at least the length of the longest string
+
+    >>> encode(['01', '2', '', '13'])
+    array([[0, 1],
+           [2, 3],
+           [3, 3],
+           [1, 4]], dtype=uint8)
+    '''
+    if width is None:
+        width = max([len(s) for s in strings] + [0])
+    batch = numpy.full((len(strings), width), PAD, dtype=numpy.uint8)
+    for row in range(len(strings)):
+        s = strings[row]
+        if s:
+            # characters that are not a single byte can never match
+            raw = s.encode('latin-1', 'replace')
+            batch[row, :len(s)] = BYTE_CODES[
+                numpy.frombuffer(raw, dtype=numpy.uint8)]
+    return batch
+
+
+class NumpyDFA:
+    '''A complete DFA for a RegexTree, stored as NumPy arrays so a whole batch
+    of strings can be moved through it together.
+    '''
+    def __init__(self, r):
+        '''(NumpyDFA, RegexTree) -> NoneType
+
+        A new NumpyDFA matching the same strings as the RegexTree rooted at r
+
+        REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+        '''
+        rows, accepting = build_dfa_table(r)
+        # one extra state that nothing leads out of, for INVALID characters
+        dead = len(rows)
+        table = numpy.empty((dead + 1, CODES), dtype=numpy.int64)
+        table[:dead, :PAD] = rows
+        table[dead, :PAD] = dead
+        # PAD leaves every state where it is
+        table[:, PAD] = numpy.arange(dead + 1)
+        table[:, INVALID] = dead
+        # states are kept as the index of their row in the flattened table,
+        # so that moving on is one lookup of (state + code) in it
+        size = (dead + 1) * CODES
+        if size <= 256:
+            state_type = numpy.uint8
+        elif size <= 65536:
+            state_type = numpy.uint16
+        else:
+            state_type = numpy.uint32
+        self._table = (table * CODES).ravel().astype(state_type)
+        self._accepting = numpy.array(accepting + [False], dtype=bool)
+        self._state_type = state_type
+
+    def __len__(self):
+        '''(NumpyDFA) -> int
+
+        Return the number of states of this DFA
+        '''
+        return len(self._accepting)
+
+    def match(self, batch):
+        '''(NumpyDFA, numpy.ndarray or list of str) -> numpy.ndarray
+
+        Returns a 1-D bool array holding whether each row of batch (a 2-D
+        uint8 array as returned by encode) matches. A list of strings is
+        encoded first.
+
+        REQ: every value in batch must be 0, 1, 2, PAD or INVALID, and PAD
+        may only be followed by PAD
+
+        >>> dfa = NumpyDFA(StarTree(BarTree(Leaf('0'), Leaf('1'))))
+        >>> dfa.match(['010110100101010', '0102001010', ''])
+        array([ True, False,  True])
+        >>> dfa.match(numpy.array([[0, 1], [1, 2]], dtype=numpy.uint8))
+        array([ True, False])
+        '''
+        if not isinstance(batch, numpy.ndarray):
+            batch = encode(batch)
+        # stored column by column, so each column read is contiguous
+        batch = numpy.asfortranarray(batch)
+        table = self._table
+        # every row starts in the start state, whose row starts at 0
+        states = numpy.zeros(batch.shape[0], dtype=self._state_type)
+        indexes = numpy.empty_like(states)
+        for column in range(batch.shape[1]):
+            # state = table[state, column], without making new arrays
+            numpy.add(states, batch[:, column], out=indexes, casting='unsafe')
+            table.take(indexes, out=states)
+        return self._accepting[states // CODES]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
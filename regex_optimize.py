@@ -0,0 +1,313 @@
+'''
+Simplifies RegexTrees before they are matched, without changing which strings
+they match. optimize rebuilds a tree from the bottom up, and each new node is
+simplified as it is made:
+- a star of a star (or of 'e') is just its child, and 'e' or a star is
+  dropped from the alternatives of a bar under a star: (e|r*)* is r*
+- 'e' is dropped from concatenations, which are kept right-nested: (e.r) is r
+- alternatives are flattened out of nested bars, duplicates are dropped,
+  every alternative that is a single symbol is folded into one SetLeaf, and
+  common prefixes are factored out: ((r.s)|(r.t)) is (r.(s|t))
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf, SetLeaf
+
+# marks the end of a sequence in the tries built by optimized_bar
+END = None
+
+
+def optimize(r):
+    '''(RegexTree) -> RegexTree
+
+    Returns a RegexTree matching exactly the same strings as the RegexTree
+    rooted at r, usually with fewer nodes. The tree is walked with an
+    explicit stack, so it can be of any depth.
+
+    REQ: r must be a valid RegexTree
+
+    >>> optimize(StarTree(StarTree(StarTree(Leaf('2')))))
+    StarTree(Leaf('2'))
+    >>> optimize(DotTree(Leaf('e'), BarTree(Leaf('1'), Leaf('1'))))
+    Leaf('1')
+    >>> optimize(BarTree(BarTree(Leaf('0'), Leaf('2')), Leaf('0')))
+    SetLeaf('02')
+    >>> optimize(BarTree(DotTree(Leaf('1'), StarTree(Leaf('0'))),
+    ...                  DotTree(Leaf('1'), Leaf('2'))))
+    DotTree(Leaf('1'), BarTree(StarTree(Leaf('0')), Leaf('2')))
+
+    Matching is never changed (checked here for every regex made from some
+    characters against every string of up to three symbols):
+
+    >>> from itertools import product
+    >>> from regex_functions import (regex_match, build_regex_tree,
+    ...                              all_regex_permutations)
+    >>> strings = [''.join(chars) for size in range(4)
+    ...            for chars in product('012', repeat=size)]
+    >>> trees = [build_regex_tree(regex) for chars in
+    ...          ['((0.1)|(0.2))', '((1|e)*.1)*', '(((0|1)|1).e)']
+    ...          for regex in all_regex_permutations(chars)]
+    >>> all([regex_match(optimize(tree), s) == regex_match(tree, s)
+    ...      for tree in trees for s in strings])
+    True
+
+    Every run of nested dots or bars is rebuilt once, so long chains (like
+    the ones build_regex_tree makes) take linear time:
+
+    >>> regex = '0'
+    >>> for i in range(2000):
+    ...     regex = '(' + regex + '.1*)'
+    >>> optimize_report(build_regex_tree(regex))[1:]
+    (6001, 6001)
+    '''
+    # the optimized subtrees waiting for their parent
+    done = []
+    # nodes to optimize, each with None until it has been split into the
+    # operands that are optimized before it
+    to_optimize = [(r, None)]
+    while to_optimize:
+        node, operands = to_optimize.pop()
+        symbol = node.get_symbol()
+        # leaves are already as simple as they get
+        if not node.get_children():
+            done.append(node)
+        elif operands is None:
+            # a whole run of nested dots (or bars) is split up at once, so
+            # that a long chain is only walked and rebuilt once
+            if symbol == '*':
+                operands = node.get_children()
+            elif symbol == '|':
+                operands = alternatives(node)
+            else:
+                operands = sequence(node)
+            to_optimize.append((node, operands))
+            for operand in reversed(operands):
+                to_optimize.append((operand, None))
+        else:
+            optimized = done[len(done) - len(operands):]
+            del done[len(done) - len(operands):]
+            if symbol == '*':
+                done.append(optimized_star(optimized[0]))
+            elif symbol == '|':
+                choices = []
+                for operand in optimized:
+                    choices.extend(alternatives(operand))
+                done.append(optimized_bar(choices))
+            else:
+                parts = []
+                for operand in optimized:
+                    parts.extend(sequence(operand))
+                done.append(optimized_dot(parts))
+    return done.pop()
+
+
+def optimize_report(r):
+    '''(RegexTree) -> tuple of (RegexTree, int, int)
+
+    Returns the optimized tree for the RegexTree rooted at r (see optimize),
+    with the number of nodes in r and in the optimized tree.
+
+    REQ: r must be a valid RegexTree
+
+    >>> optimize_report(BarTree(StarTree(StarTree(Leaf('1'))), Leaf('e')))
+    (BarTree(StarTree(Leaf('1')), Leaf('e')), 5, 4)
+    '''
+    optimized = optimize(r)
+    return optimized, node_count(r), node_count(optimized)
+
+
+def node_count(r):
+    '''(RegexTree) -> int
+
+    Returns the number of nodes in the RegexTree rooted at r
+
+    REQ: r must be a valid RegexTree
+
+    >>> node_count(DotTree(StarTree(Leaf('1')), Leaf('0')))
+    4
+    '''
+    count = 0
+    to_count = [r]
+    while to_count:
+        node = to_count.pop()
+        count += 1
+        to_count.extend(node.get_children())
+    return count
+
+
+def is_empty(r):
+    '''(RegexTree) -> bool
+
+    Returns whether r is the leaf 'e'
+    '''
+    return r.get_symbol() == 'e' and not r.get_children()
+
+
+def alternatives(r):
+    '''(RegexTree) -> list of RegexTree
+
+    Returns the alternatives of the bars at the top of the tree rooted at r,
+    in order (just [r] if r is not a bar).
+
+    >>> alternatives(BarTree(BarTree(Leaf('0'), Leaf('1')), Leaf('2')))
+    [Leaf('0'), Leaf('1'), Leaf('2')]
+    '''
+    found = []
+    to_split = [r]
+    while to_split:
+        node = to_split.pop()
+        if node.get_symbol() == '|':
+            # the right alternatives go under the left ones on the stack
+            to_split.extend(reversed(node.get_children()))
+        else:
+            found.append(node)
+    return found
+
+
+def sequence(r):
+    '''(RegexTree) -> list of RegexTree
+
+    Returns the parts of the concatenation at the top of the tree rooted at
+    r, in order, leaving out every 'e' (so [] for r = 'e').
+
+    >>> sequence(DotTree(Leaf('0'), DotTree(Leaf('e'), StarTree(Leaf('1')))))
+    [Leaf('0'), StarTree(Leaf('1'))]
+    '''
+    found = []
+    to_split = [r]
+    while to_split:
+        node = to_split.pop()
+        if node.get_symbol() == '.':
+            to_split.extend(reversed(node.get_children()))
+        elif not is_empty(node):
+            found.append(node)
+    return found
+
+
+def optimized_dot(parts):
+    '''(list of RegexTree) -> RegexTree
+
+    Returns the right-nested concatenation of parts (none of which are
+    concatenations or 'e'), or 'e' if there are no parts.
+    '''
+    if not parts:
+        return Leaf('e')
+    result = parts[-1]
+    for i in range(len(parts) - 2, -1, -1):
+        result = DotTree(parts[i], result)
+    return result
+
+
+def optimized_star(child):
+    '''(RegexTree) -> RegexTree
+
+    Returns a tree matching the same strings as StarTree(child), where child
+    is already optimized.
+
+    >>> optimized_star(BarTree(Leaf('e'), StarTree(Leaf('0'))))
+    StarTree(Leaf('0'))
+    '''
+    if child.get_symbol() == '|':
+        # a star matches '' anyway, and repeating r* is the same as
+        # repeating r, so 'e' and the outer stars of alternatives go
+        choices = []
+        for choice in alternatives(child):
+            while choice.get_symbol() == '*':
+                choice = choice.get_children()[0]
+            if not is_empty(choice):
+                choices.append(choice)
+        child = optimized_bar(choices)
+    if child.get_symbol() == '*' or is_empty(child):
+        result = child
+    else:
+        result = StarTree(child)
+    return result
+
+
+def optimized_bar(choices):
+    '''(list of RegexTree) -> RegexTree
+
+    Returns a tree matching any one of choices (none of which are bars), with
+    duplicates dropped, single symbols folded into one leaf and common
+    prefixes factored out. Returns 'e' if there are no choices.
+
+    >>> optimized_bar([Leaf('1'), DotTree(Leaf('0'), Leaf('2')), Leaf('e'),
+    ...                Leaf('2'), DotTree(Leaf('0'), Leaf('1'))])
+    BarTree(SetLeaf('12'), BarTree(DotTree(Leaf('0'), SetLeaf('12')), \
+Leaf('e')))
+    '''
+    # the choices go into a trie of their sequences (nested dicts, one level
+    # per part, with END in the dict where a sequence stops), so that each
+    # shared prefix is only kept once
+    trie = {}
+    for choice in choices:
+        branch = trie
+        for part in sequence(choice):
+            branch = branch.setdefault(part, {})
+        branch[END] = True
+    # the tree for each trie below the one on top of the stack, in order
+    done = []
+    to_build = [(trie, False)]
+    while to_build:
+        branch, children_done = to_build.pop()
+        parts = [part for part in branch if part is not END]
+        if parts and not children_done:
+            to_build.append((branch, True))
+            for part in reversed(parts):
+                to_build.append((branch[part], False))
+        else:
+            tails = done[len(done) - len(parts):]
+            del done[len(done) - len(parts):]
+            # each part followed by whatever can come after it, and 'e' for
+            # a sequence that stops here
+            options = []
+            for i in range(len(parts)):
+                options.append(optimized_dot([parts[i]] + sequence(tails[i])))
+            if END in branch and parts:
+                options.append(Leaf('e'))
+            done.append(fold_symbols(options))
+    return done.pop()
+
+
+def fold_symbols(options):
+    '''(list of RegexTree) -> RegexTree
+
+    Returns the right-nested bar of options, with every option that is a
+    single symbol folded into one leaf (in the place of the first one).
+    Returns 'e' if there are no options.
+
+    >>> fold_symbols([Leaf('2'), StarTree(Leaf('0')), Leaf('1')])
+    BarTree(SetLeaf('12'), StarTree(Leaf('0')))
+    '''
+    symbols = ''
+    folded = []
+    for option in options:
+        if option.get_children() or is_empty(option):
+            folded.append(option)
+        else:
+            # the first symbol saves a place for the folded leaf
+            if symbols == '':
+                first = len(folded)
+                folded.append(None)
+            symbols += option.get_symbol()
+    if len(set(symbols)) == 1:
+        folded[first] = Leaf(symbols[0])
+    elif symbols:
+        folded[first] = SetLeaf(symbols)
+    return bar_of(folded)
+
+
+def bar_of(options):
+    '''(list of RegexTree) -> RegexTree
+
+    Returns the right-nested bar of options, or 'e' if there are none.
+    '''
+    if not options:
+        return Leaf('e')
+    result = options[-1]
+    for i in range(len(options) - 2, -1, -1):
+        result = BarTree(options[i], result)
+    return result
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,111 @@
+'''
+Finds every valid regex permutation of a string (like all_regex_permutations
+in regex_functions.py) using several processes. The regexs are split into
+disjoint shards by how the top of the regex is built: the number of stars on
+the outside, the main operator, and which characters go to its left and right
+sub regexs (see regex_splits). No regex can be built by two different shards,
+so the results of the shards never have to be checked against each other.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from regex_functions import (regex_counts, regex_splits, build_regexes,
+                             count_regexes)
+
+# the regexs built so far for each character count, kept for the lifetime of
+# each worker process so that the shards it is given can share them
+_worker_memo = {}
+
+
+def build_shards(shards):
+    '''(list of tuple) -> list of string
+
+    Returns every regex built by the given shards (each a split as yielded by
+    regex_splits). This runs inside the worker processes.
+
+    >>> sorted(build_shards([(1, '|', (0, 1, 0, 0, 0, 0, 0),
+    ...                               (1, 0, 0, 0, 0, 0, 0))]))
+    ['(1|0)*']
+    '''
+    regexes = []
+    for top_stars, op, left_key, right_key in shards:
+        right_regexes = build_regexes(right_key, _worker_memo)
+        for left in build_regexes(left_key, _worker_memo):
+            for right in right_regexes:
+                regexes.append('(' + left + op + right + ')' + '*' * top_stars)
+    return regexes
+
+
+def shard_batches(key, batches):
+    '''(tuple of int, int) -> list of list of tuple
+
+    Returns the shards (splits) for the characters counted by key, dealt out
+    into at most batches lists of about the same amount of work. Each split
+    is weighted by the number of regexs it will build.
+
+    REQ: key must count at least one '|' or '.'
+    REQ: batches >= 1
+    '''
+    # the regexs are counted rather than built, so this is quick
+    weighted = []
+    for split in regex_splits(key):
+        weight = count_regexes(split[2]) * count_regexes(split[3])
+        if weight > 0:
+            weighted.append((weight, split))
+    # biggest shards first, each to the batch with the least work so far
+    weighted.sort(key=lambda pair: pair[0], reverse=True)
+    work = [0] * batches
+    dealt = [[] for i in range(batches)]
+    for weight, split in weighted:
+        lightest = work.index(min(work))
+        work[lightest] += weight
+        dealt[lightest].append(split)
+    return [batch for batch in dealt if batch]
+
+
+def generate_regexes_parallel(s, workers=None, batches_per_worker=4):
+    '''(string[, int, int]) -> generator of string
+
+    Yields every distinct permutation of s that is a valid regex, exactly
+    once each, building them in a pool of workers processes (the number of
+    CPUs by default). The shards are split into batches_per_worker batches
+    per worker, and regexs are yielded as soon as each batch is done.
+
+    REQ: s must be a string
+    REQ: workers >= 1 and batches_per_worker >= 1
+    '''
+    key = regex_counts(s)
+    if key is not None:
+        # no operators: the only regex is the leaf and all of its stars
+        if key[4] + key[5] == 0:
+            for regex in build_regexes(key, {}):
+                yield regex
+        else:
+            if workers is None:
+                workers = os.cpu_count() or 1
+            batches = shard_batches(key, workers * batches_per_worker)
+            with ProcessPoolExecutor(workers) as pool:
+                for regexes in pool.map(build_shards, batches):
+                    for regex in regexes:
+                        yield regex
+
+
+def parallel_regex_permutations(s, workers=None):
+    '''(string[, int]) -> set of strings
+
+    Returns the same set as all_regex_permutations(s), built by a pool of
+    workers processes (the number of CPUs by default).
+
+    REQ: s must be a string
+    REQ: workers >= 1
+
+    >>> sorted(parallel_regex_permutations('(1|0)', 2))
+    ['(0|1)', '(1|0)']
+    >>> parallel_regex_permutations('2**', 2)
+    {'2**'}
+    '''
+    return set(generate_regexes_parallel(s, workers))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,225 @@
+'''
+Matches a string against many RegexTrees at once. Every pattern is compiled
+into the same Thompson NFA (as a separate fragment), and a lazily built DFA
+over that NFA tracks all of the patterns together, so a single scan of the
+string finds every pattern it matches. Each DFA state knows the ids of the
+patterns whose accepting NFA state it contains.
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf
+from regex_nfa import NFA, add_tree
+from regex_dfa import ALPHABET, SYMBOL_CODES, UNKNOWN
+
+
+class PatternSet:
+    '''A set of RegexTrees, each with an id, that strings can be matched
+    against all at once.
+    '''
+    def __init__(self, max_states=4096):
+        '''(PatternSet[, int]) -> NoneType
+
+        A new, empty PatternSet. When more than max_states DFA states have
+        been built, they are all thrown away and built again as needed.
+
+        REQ: max_states >= 1
+        '''
+        self._max_states = max_states
+        # the NFA holding a fragment for every pattern (and for patterns that
+        # have been removed, until it is rebuilt)
+        self._nfa = NFA()
+        # the tree, the (start, accept) states and the number of NFA states
+        # of every pattern, by id
+        self._trees = {}
+        self._fragments = {}
+        self._sizes = {}
+        # the pattern id of each accepting NFA state
+        self._owners = {}
+        # the number of NFA states left behind by removed patterns
+        self._unused = 0
+        self._next_id = 0
+        self._reset_dfa()
+
+    def _reset_dfa(self):
+        '''(PatternSet) -> NoneType
+
+        Forgets every DFA state built so far.
+        '''
+        # the set of NFA states, the transitions (one column per symbol of
+        # ALPHABET) and the matching pattern ids of every DFA state
+        self._keys = []
+        self._table = []
+        self._matched = []
+        # maps a set of NFA states to its DFA state
+        self._states = {}
+        # the DFA state before anything is read, found when it is first needed
+        self._start = UNKNOWN
+
+    def __len__(self):
+        '''(PatternSet) -> int
+
+        Return the number of patterns in this PatternSet
+        '''
+        return len(self._trees)
+
+    def __contains__(self, pattern_id):
+        '''(PatternSet, int) -> bool
+
+        Return whether pattern_id is the id of a pattern in this PatternSet
+        '''
+        return pattern_id in self._trees
+
+    def get_pattern(self, pattern_id):
+        '''(PatternSet, int) -> RegexTree
+
+        Return the pattern with id pattern_id
+
+        REQ: pattern_id must be in this PatternSet
+        '''
+        return self._trees[pattern_id]
+
+    def add(self, r):
+        '''(PatternSet, RegexTree) -> int
+
+        Adds the RegexTree rooted at r to this PatternSet, and returns the id
+        it was given. Only r is compiled; since its NFA states are separate
+        from every other pattern's, the DFA states already built stay valid
+        and only the start state has to change.
+
+        REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+
+        >>> patterns = PatternSet()
+        >>> patterns.add(StarTree(Leaf('1')))
+        0
+        >>> patterns.add(DotTree(Leaf('1'), Leaf('1')))
+        1
+        >>> patterns.match('11')
+        [0, 1]
+        '''
+        pattern_id = self._next_id
+        self._next_id += 1
+        self._add_fragment(pattern_id, r)
+        self._start = UNKNOWN
+        return pattern_id
+
+    def _add_fragment(self, pattern_id, r):
+        '''(PatternSet, int, RegexTree) -> NoneType
+
+        Compiles r into the NFA as the pattern with id pattern_id
+        '''
+        first = len(self._nfa)
+        start, accept = add_tree(self._nfa, r)
+        self._trees[pattern_id] = r
+        self._fragments[pattern_id] = (start, accept)
+        self._sizes[pattern_id] = len(self._nfa) - first
+        self._owners[accept] = pattern_id
+
+    def remove(self, pattern_id):
+        '''(PatternSet, int) -> NoneType
+
+        Removes the pattern with id pattern_id from this PatternSet. The DFA
+        states built so far mention the pattern, so they are thrown away; the
+        NFA itself is only rebuilt (from the remaining patterns) once most of
+        its states belong to removed patterns.
+
+        REQ: pattern_id must be in this PatternSet
+
+        >>> patterns = PatternSet()
+        >>> patterns.add(StarTree(Leaf('1')))
+        0
+        >>> patterns.add(Leaf('1'))
+        1
+        >>> patterns.remove(0)
+        >>> patterns.match('1')
+        [1]
+        '''
+        start, accept = self._fragments.pop(pattern_id)
+        del self._trees[pattern_id]
+        del self._owners[accept]
+        self._unused += self._sizes.pop(pattern_id)
+        if self._unused * 2 > len(self._nfa):
+            self._rebuild_nfa()
+        self._reset_dfa()
+
+    def _rebuild_nfa(self):
+        '''(PatternSet) -> NoneType
+
+        Compiles the remaining patterns (keeping their ids) into a new NFA,
+        leaving out the states of removed patterns.
+        '''
+        trees = self._trees
+        self._nfa = NFA()
+        self._trees = {}
+        self._fragments = {}
+        self._sizes = {}
+        self._owners = {}
+        self._unused = 0
+        for pattern_id in sorted(trees):
+            self._add_fragment(pattern_id, trees[pattern_id])
+
+    def _state_for(self, key):
+        '''(PatternSet, frozenset of int) -> int
+
+        Return the DFA state for the set of NFA states key, building it if
+        needed.
+        '''
+        state = self._states.get(key)
+        if state is None:
+            state = len(self._keys)
+            self._keys.append(key)
+            self._table.append([UNKNOWN] * len(ALPHABET))
+            owners = self._owners
+            self._matched.append(sorted(
+                [owners[nfa_state] for nfa_state in key
+                 if nfa_state in owners]))
+            self._states[key] = state
+        return state
+
+    def _start_state(self):
+        '''(PatternSet) -> int
+
+        Return the DFA state before anything is read, throwing away all the
+        DFA states if there are too many.
+        '''
+        if len(self._keys) > self._max_states:
+            self._reset_dfa()
+        if self._start == UNKNOWN:
+            self._start = self._state_for(self._nfa.closure(
+                [start for start, accept in self._fragments.values()]))
+        return self._start
+
+    def match(self, s):
+        '''(PatternSet, str) -> list of int
+
+        Return the ids, in increasing order, of every pattern that s matches,
+        reading s only once.
+
+        >>> patterns = PatternSet()
+        >>> ids = [patterns.add(StarTree(BarTree(Leaf('0'), Leaf('1')))),
+        ...        patterns.add(DotTree(StarTree(Leaf('0')), Leaf('1'))),
+        ...        patterns.add(StarTree(Leaf('2')))]
+        >>> patterns.match('0001')
+        [0, 1]
+        >>> patterns.match('')
+        [0, 2]
+        >>> patterns.match('3')
+        []
+        '''
+        state = self._start_state()
+        # looking these up once instead of on every character
+        table = self._table
+        codes = SYMBOL_CODES
+        for char in s:
+            code = codes.get(char)
+            if code is None:
+                return []
+            target = table[state][code]
+            if target == UNKNOWN:
+                key = self._nfa.step(self._keys[state], ALPHABET[code])
+                target = self._state_for(key)
+                table[state][code] = target
+            state = target
+        return list(self._matched[state])
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
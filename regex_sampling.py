@@ -0,0 +1,150 @@
+'''
+Draws random valid regexs made from the characters of a string, uniformly
+from all of its valid permutations (every regex all_regex_permutations would
+return is equally likely), without building any of the others. As explained
+in count_regexes, a valid regex is made of four independent choices: the
+shape of its tree, the order of its operators, the order of its leaves and
+how its stars are spread over its nodes. Each of them is drawn uniformly on
+its own, the shape using the counts from tree_shapes.
+'''
+import random
+from bisect import bisect_right
+from regex_functions import LEAF_CHARS, regex_counts, tree_shapes
+
+
+class RegexSampler:
+    '''Draws uniformly random valid regexs made from the characters of a
+    string.
+    '''
+    def __init__(self, s, seed=None):
+        '''(RegexSampler, str[, object]) -> NoneType
+
+        A new RegexSampler for the valid permutations of s. Samplers made
+        with the same seed (anything random.Random accepts) draw the same
+        regexs; with no seed they are different every time.
+
+        REQ: s must have at least one permutation that is a valid regex
+        '''
+        key = regex_counts(s)
+        if key is None:
+            raise ValueError('no permutation of {!r} is a valid regex'.format(
+                s))
+        self._random = random.Random(seed)
+        self._leaves = []
+        for i in range(len(LEAF_CHARS)):
+            self._leaves.extend(LEAF_CHARS[i] * key[i])
+        self._operators = ['|'] * key[4] + ['.'] * key[5]
+        self._stars = key[6]
+        operators = len(self._operators)
+        shapes = tree_shapes(operators)
+        # splits[m][left] is the number of shapes of a regex with m operators
+        # whose r1 has fewer than left + 1 operators, so a random number
+        # below shapes[m] picks the operators of r1 with the right odds
+        self._shapes = shapes
+        self._splits = []
+        for total in range(operators + 1):
+            running = 0
+            split = []
+            for left in range(total):
+                running += shapes[left] * shapes[total - 1 - left]
+                split.append(running)
+            self._splits.append(split)
+
+    def _star_counts(self, nodes):
+        '''(RegexSampler, int) -> list of int
+
+        Returns how many stars follow each of nodes nodes, picked uniformly
+        from every way of sharing out the stars (by placing nodes - 1
+        dividers among the stars).
+        '''
+        rand = self._random
+        slots = self._stars + nodes - 1
+        dividers = sorted(rand.sample(range(slots), nodes - 1))
+        counts = []
+        previous = -1
+        for divider in dividers:
+            counts.append(divider - previous - 1)
+            previous = divider
+        counts.append(slots - previous - 1)
+        return counts
+
+    def sample(self):
+        '''(RegexSampler) -> str
+
+        Return a random valid regex made of the characters this sampler was
+        made from.
+
+        >>> sampler = RegexSampler('(1*.(1|0))', 7)
+        >>> regex = sampler.sample()
+        >>> from regex_functions import all_regex_permutations
+        >>> regex in all_regex_permutations('(1*.(1|0))')
+        True
+        >>> RegexSampler('2**').sample()
+        '2**'
+        '''
+        rand = self._random
+        leaves = self._leaves[:]
+        operators = self._operators[:]
+        rand.shuffle(leaves)
+        rand.shuffle(operators)
+        stars = self._star_counts(len(leaves) + len(operators))
+        shapes = self._shapes
+        splits = self._splits
+        pieces = []
+        # the next leaf, operator and star count to use
+        next_leaf = next_operator = next_stars = 0
+        # regexs still to be written (as their number of operators) and
+        # pieces of text to write once the regexs before them are done
+        to_write = [len(operators)]
+        while to_write:
+            item = to_write.pop()
+            if isinstance(item, str):
+                pieces.append(item)
+            elif item == 0:
+                pieces.append(leaves[next_leaf] + '*' * stars[next_stars])
+                next_leaf += 1
+                next_stars += 1
+            else:
+                left = bisect_right(splits[item], rand.randrange(shapes[item]))
+                to_write.append(')' + '*' * stars[next_stars])
+                to_write.append(item - 1 - left)
+                to_write.append(operators[next_operator])
+                to_write.append(left)
+                pieces.append('(')
+                next_operator += 1
+                next_stars += 1
+        return ''.join(pieces)
+
+    def samples(self, count):
+        '''(RegexSampler, int) -> generator of str
+
+        Yields count random valid regexs (drawn independently, so the same
+        regex can come up more than once).
+
+        >>> sampler = RegexSampler('(0|1)', 'seed')
+        >>> sorted(set(sampler.samples(50)))
+        ['(0|1)', '(1|0)']
+        '''
+        for i in range(count):
+            yield self.sample()
+
+
+def sample_regexes(s, count, seed=None):
+    '''(str, int[, object]) -> list of str
+
+    Returns count random valid regexs made from the characters of s, each
+    drawn uniformly from all of the valid permutations of s. The same seed
+    always gives the same regexs.
+
+    REQ: s must have at least one permutation that is a valid regex
+
+    >>> first = sample_regexes('(0.(1|2))*', 3, 1)
+    >>> first == sample_regexes('(0.(1|2))*', 3, 1)
+    True
+    '''
+    return list(RegexSampler(s, seed).samples(count))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
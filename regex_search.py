@@ -0,0 +1,195 @@
+'''
+Finds every part of a long text that matches a RegexTree, rather than only
+checking whether the whole text matches. Matches are found from left to
+right, each as long as possible (leftmost-longest), and they never overlap.
+The text is read once from left to right by an NFA that tracks, for each
+of its states, the leftmost place a match through it could have started,
+so every start is tried at once. Whenever no match is under way, the scan
+skips ahead (with str.find) to the next place the text starts with the
+literal that every match of the tree has to start with (found by
+required_prefix).
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf
+from regex_nfa import compile_nfa
+
+
+def finditer(r, text):
+    '''(RegexTree, str) -> generator of tuple of (int, int)
+
+    Yields the (start, end) span of every match of the RegexTree rooted at r
+    in text, in order: the match starting furthest to the left, taking the
+    longest one there, then the next one starting at or after its end, and
+    so on. Like re.finditer, an empty match is only found where no longer
+    match starts, and the search then moves on by one character.
+
+    The tree is compiled once into an NFA, and each search reads text once
+    from left to right, with a new start added at every character until a
+    match is found. Each active NFA state only keeps the leftmost start it
+    was reached from, so a search takes O(number of characters read * size
+    of r) time wherever it starts, and a text with no matches is read just
+    once. The only characters read twice are the ones a search reads past
+    the end of its match while looking for a longer one, which the next
+    search starts from again (as with (0*.1)|0 on a long run of 0s).
+
+    REQ: r must be a valid RegexTree
+
+    >>> tree = DotTree(Leaf('0'), StarTree(Leaf('1')))
+    >>> list(finditer(tree, '2011101201'))
+    [(1, 5), (5, 7), (8, 10)]
+    >>> list(finditer(StarTree(Leaf('1')), '0110'))
+    [(0, 0), (1, 3), (3, 3), (4, 4)]
+    >>> list(finditer(BarTree(Leaf('0'), DotTree(Leaf('0'), Leaf('1'))),
+    ...               '0x01'))
+    [(0, 1), (2, 4)]
+    >>> list(finditer(BarTree(DotTree(StarTree(Leaf('0')), Leaf('1')),
+    ...                       Leaf('2')), '0' * 20000 + '12'))
+    [(0, 20001), (20001, 20002)]
+    '''
+    nfa = compile_nfa(r)
+    accept = nfa.get_accept()
+    initial = active_states(nfa, nfa.initial())
+    symbols = [nfa.get_symbol(state) for state in range(len(nfa))]
+    # the active states reached by reading the symbol of each state
+    following = []
+    for state in range(len(nfa)):
+        if symbols[state] is None:
+            following.append([])
+        else:
+            following.append(active_states(
+                nfa, nfa.closure([nfa.get_target(state)])))
+    prefix = required_prefix(r)
+    position = 0
+    while position <= len(text):
+        # each active state, with the leftmost start it was reached from (in
+        # order of start, so the first start to reach a state is the
+        # leftmost)
+        threads = {}
+        match_start = match_end = -1
+        index = position
+        while True:
+            # new matches are only started until one is found
+            if match_start == -1:
+                # with nothing active, skip to where the prefix is found
+                if not threads and prefix:
+                    index = text.find(prefix, index)
+                    if index == -1:
+                        return
+                for state in initial:
+                    if state not in threads:
+                        threads[state] = index
+            if accept in threads:
+                match_start, match_end = threads[accept], index
+                # states reached from a later start can only give a match
+                # further to the right
+                threads = {state: start for state, start in threads.items()
+                           if start <= match_start}
+            if not threads or index == len(text):
+                break
+            char = text[index]
+            stepped = {}
+            for state, start in threads.items():
+                if symbols[state] == char:
+                    for target in following[state]:
+                        if target not in stepped:
+                            stepped[target] = start
+            threads = stepped
+            index += 1
+        if match_start == -1:
+            return
+        yield match_start, match_end
+        # an empty match moves the search on by one character
+        if match_end == match_start:
+            position = match_end + 1
+        else:
+            position = match_end
+
+
+def active_states(nfa, states):
+    '''(NFA, iterable of int) -> list of int
+
+    Returns the states of nfa in states that finditer keeps track of, in
+    order: the ones that read a symbol, and the accepting state. Epsilon
+    states are only passed through, so they are left out.
+    '''
+    return [state for state in sorted(states)
+            if state == nfa.get_accept() or nfa.get_symbol(state) is not None]
+
+
+def findall(r, text):
+    '''(RegexTree, str) -> list of str
+
+    Returns the text of every match found by finditer(r, text), in order
+
+    REQ: r must be a valid RegexTree
+
+    >>> findall(DotTree(Leaf('1'), Leaf('2')), '1212012')
+    ['12', '12', '12']
+    '''
+    return [text[start:end] for start, end in finditer(r, text)]
+
+
+def required_prefix(r):
+    '''(RegexTree) -> str
+
+    Returns the longest string that every string matched by the RegexTree
+    rooted at r starts with ('' if there is none). The tree is walked with
+    an explicit stack, so it can be of any depth.
+
+    REQ: r must be a valid RegexTree
+
+    >>> required_prefix(DotTree(DotTree(Leaf('0'), Leaf('1')),
+    ...                         StarTree(Leaf('2'))))
+    '01'
+    >>> required_prefix(BarTree(DotTree(Leaf('0'), Leaf('1')),
+    ...                         DotTree(Leaf('0'), Leaf('2'))))
+    '0'
+    >>> required_prefix(DotTree(StarTree(Leaf('0')), Leaf('1')))
+    ''
+    '''
+    # for each subtree, in postorder: its required prefix, and whether that
+    # prefix is the only string it matches
+    done = []
+    to_visit = [(r, False)]
+    while to_visit:
+        node, children_done = to_visit.pop()
+        children = node.get_children()
+        symbol = node.get_symbol()
+        if children and not children_done:
+            to_visit.append((node, True))
+            for child in reversed(children):
+                to_visit.append((child, False))
+        elif not children:
+            if symbol == 'e':
+                done.append(('', True))
+            # a SetLeaf can start with any of its symbols
+            elif len(symbol) > 1:
+                done.append(('', False))
+            else:
+                done.append((symbol, True))
+        elif symbol == '*':
+            # a star also matches '', so nothing is required
+            done.pop()
+            done.append(('', False))
+        else:
+            right, right_exact = done.pop()
+            left, left_exact = done.pop()
+            if symbol == '.':
+                # the right prefix only follows if the left is always the same
+                if left_exact:
+                    done.append((left + right, right_exact))
+                else:
+                    done.append((left, False))
+            else:
+                # the longest prefix shared by both alternatives
+                shared = 0
+                while (shared < min(len(left), len(right)) and
+                       left[shared] == right[shared]):
+                    shared += 1
+                done.append((left[:shared], left_exact and right_exact and
+                             left == right))
+    return done.pop()[0]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,116 @@
+'''
+A compact binary format for RegexTrees. A tree is written as one byte per
+node, in preorder (each node before its children, left child first), using
+the opcodes from regex_flat.py, after a single byte holding FORMAT_VERSION.
+Since every opcode says how many children its node has, no brackets or
+lengths are needed, and both writing and reading take one pass without
+recursion.
+'''
+from regextree import StarTree, DotTree, BarTree, Leaf, SetLeaf
+from regex_flat import (OP_STAR, OP_BAR, OP_DOT, OP_SET_01, OP_SYMBOLS,
+                        SYMBOL_OPS)
+
+# the first byte of every dump, changed whenever the format changes
+FORMAT_VERSION = 1
+
+
+def dumps(r):
+    '''(RegexTree) -> bytes
+
+    Returns the bytes for the RegexTree rooted at r: FORMAT_VERSION, then the
+    opcode of every node in preorder.
+
+    REQ: r must be a valid RegexTree
+
+    >>> dumps(DotTree(StarTree(Leaf('1')), Leaf('e')))
+    b'\\x01\\x06\\x04\\x01\\x03'
+    '''
+    data = bytearray([FORMAT_VERSION])
+    to_write = [r]
+    while to_write:
+        node = to_write.pop()
+        data.append(SYMBOL_OPS[node.get_symbol()])
+        # the left child goes on top, so it is written first
+        to_write.extend(reversed(node.get_children()))
+    return bytes(data)
+
+
+def loads(data):
+    '''(bytes) -> RegexTree
+
+    Returns the RegexTree written to data by dumps. Leaves with the same
+    symbol are shared by the tree (just as RegexTree.intern would share
+    them). A ValueError is raised if data is not a dump of this
+    FORMAT_VERSION.
+
+    REQ: data must be a bytes-like object
+
+    >>> tree = BarTree(DotTree(Leaf('0'), SetLeaf('12')), StarTree(Leaf('e')))
+    >>> loads(dumps(tree)) == tree
+    True
+    >>> loads(b'\\x01\\x06\\x01')
+    Traceback (most recent call last):
+    ...
+    ValueError: not a complete RegexTree dump
+    '''
+    if len(data) == 0 or data[0] != FORMAT_VERSION:
+        raise ValueError('not a RegexTree dump of version {}'.format(
+            FORMAT_VERSION))
+    # one of each kind of leaf, made only once
+    leaves = []
+    for op in range(len(OP_SYMBOLS)):
+        if op >= OP_SET_01:
+            leaves.append(SetLeaf(OP_SYMBOLS[op]))
+        elif op < OP_STAR:
+            leaves.append(Leaf(OP_SYMBOLS[op]))
+        else:
+            leaves.append(None)
+    # reading the preorder backwards, every node comes after its children,
+    # and the left child of a node ends up on top of the right one
+    done = []
+    try:
+        for index in range(len(data) - 1, 0, -1):
+            op = data[index]
+            if op == OP_STAR:
+                done.append(StarTree(done.pop()))
+            elif op == OP_BAR:
+                done.append(BarTree(done.pop(), done.pop()))
+            elif op == OP_DOT:
+                done.append(DotTree(done.pop(), done.pop()))
+            else:
+                done.append(leaves[op])
+    # a node whose children are missing, or an opcode that does not exist
+    except IndexError:
+        done = []
+    if len(done) != 1:
+        raise ValueError('not a complete RegexTree dump')
+    return done[0]
+
+
+if __name__ == '__main__':
+    import doctest
+    import timeit
+    from regex_functions import parse
+    doctest.testmod()
+    # a tree of 25001 nodes, and its dump, repr and regex string
+    tree = Leaf('0')
+    for i in range(5000):
+        tree = DotTree(BarTree(tree, StarTree(Leaf('1'))), Leaf('2'))
+    data = dumps(tree)
+    text = repr(tree)
+    regex = '((0|1*).2)'
+    for i in range(4999):
+        regex = '((' + regex + '|1*).2)'
+    # measured here: a dump is 10 times smaller than the repr, but dumps is
+    # only about 1.5 times faster than repr, and loads about 1.7 times
+    # faster than parse, since all of them do a little work for every node
+    dumps_time = timeit.timeit(lambda: dumps(tree), number=10) / 10
+    repr_time = timeit.timeit(lambda: repr(tree), number=10) / 10
+    loads_time = timeit.timeit(lambda: loads(data), number=10) / 10
+    parse_time = timeit.timeit(lambda: parse(regex), number=10) / 10
+    print('dumps: {} bytes, repr: {} bytes ({:.1f}x)'.format(
+        len(data), len(text), len(text) / len(data)))
+    print('dumps: {:.4f}s, repr: {:.4f}s ({:.1f}x)'.format(
+        dumps_time, repr_time, repr_time / dumps_time))
+    print('loads: {:.4f}s, parse: {:.4f}s ({:.1f}x)'.format(
+        loads_time, parse_time, parse_time / loads_time))
@@ -0,0 +1,131 @@
+'''
+Matches a RegexTree against input too big to hold in memory, like a
+multi-gigabyte file or a socket, one chunk at a time. Only the state of a
+LazyDFA is kept between chunks, so memory use does not depend on the length
+of the input. Input is bytes, each of which must be one of the symbols
+b'0', b'1' or b'2'; any other byte (including a newline) means no match.
+'''
+import mmap
+from regextree import StarTree, DotTree, Leaf
+from regex_dfa import LazyDFA
+
+
+class StreamMatcher:
+    '''Matches a RegexTree against input that is fed to it in chunks.'''
+    def __init__(self, r, max_states=1024):
+        '''(StreamMatcher, RegexTree[, int]) -> NoneType
+
+        A new StreamMatcher for the RegexTree rooted at r, whose LazyDFA keeps
+        at most max_states states.
+
+        REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+        REQ: max_states >= 2
+        '''
+        self._dfa = LazyDFA(r, max_states)
+        self.reset()
+
+    def reset(self):
+        '''(StreamMatcher) -> NoneType
+
+        Forgets everything fed so far, to start matching a new input. The
+        DFA states already built are kept.
+        '''
+        self._slot = self._dfa.start()
+
+    def feed(self, chunk):
+        '''(StreamMatcher, bytes) -> NoneType
+
+        Reads the next chunk of the input. Only the DFA state reached so far
+        is kept, not chunk.
+
+        >>> matcher = StreamMatcher(StarTree(DotTree(Leaf('0'), Leaf('1'))))
+        >>> matcher.feed(b'010')
+        >>> matcher.feed(b'1')
+        >>> matcher.finish()
+        True
+        '''
+        # once nothing can match, the rest of the input does not matter
+        if not self._dfa.is_dead(self._slot):
+            # one character per byte, so the chunk can be walked as a str
+            self._slot = self._dfa.advance(self._slot, chunk.decode('latin-1'))
+
+    def is_dead(self):
+        '''(StreamMatcher) -> bool
+
+        Return whether the input fed so far can no longer lead to a match,
+        however it goes on
+
+        >>> matcher = StreamMatcher(DotTree(Leaf('0'), StarTree(Leaf('1'))))
+        >>> matcher.feed(b'0112')
+        >>> matcher.is_dead()
+        True
+        '''
+        return self._dfa.is_dead(self._slot)
+
+    def finish(self):
+        '''(StreamMatcher) -> bool
+
+        Return whether all of the input fed so far matches, and get ready for
+        a new input.
+
+        >>> matcher = StreamMatcher(StarTree(Leaf('2')))
+        >>> matcher.feed(b'22x')
+        >>> matcher.finish()
+        False
+        >>> matcher.finish()
+        True
+        '''
+        matches = self._dfa.is_accepting(self._slot)
+        self.reset()
+        return matches
+
+
+def match_stream(r, stream, chunk_size=1 << 20):
+    '''(RegexTree, file[, int]) -> bool
+
+    Returns whether everything read from stream (any object with a read
+    method returning bytes, like a file opened with 'rb' or a socket's
+    makefile('rb')) matches the RegexTree rooted at r. The stream is read
+    chunk_size bytes at a time, and no further once a match is impossible.
+
+    REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+    REQ: chunk_size >= 1
+
+    >>> import io
+    >>> match_stream(StarTree(Leaf('1')), io.BytesIO(b'1' * 100), 7)
+    True
+    '''
+    matcher = StreamMatcher(r)
+    chunk = stream.read(chunk_size)
+    while chunk and not matcher.is_dead():
+        matcher.feed(chunk)
+        chunk = stream.read(chunk_size)
+    return matcher.finish()
+
+
+def match_file(r, path, chunk_size=1 << 20):
+    '''(RegexTree, str[, int]) -> bool
+
+    Returns whether the contents of the file at path match the RegexTree
+    rooted at r. The file is memory-mapped and fed to a StreamMatcher
+    chunk_size bytes at a time, so it is never read into memory all at once.
+
+    REQ: r must be a valid RegexTree, which may have SetLeaf leaves
+    REQ: chunk_size >= 1
+    '''
+    matcher = StreamMatcher(r)
+    with open(path, 'rb') as file:
+        # an empty file can not be mapped
+        size = file.seek(0, 2)
+        if size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                while start < size and not matcher.is_dead():
+                    matcher.feed(data[start:start + chunk_size])
+                    start += chunk_size
+    return matcher.finish()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
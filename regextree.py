@@ -24,8 +24,16 @@
 # you need to complete regex_functions.py
 
 
+# the longest length of a tree that matches strings of any length
+INFINITY = float('inf')
+
+
 class RegexTree:
     """Root of a regular expression tree"""
+    # no per node __dict__, since big trees have a great many nodes
+    __slots__ = ('_symbol', '_children', '_hash', '_shortest', '_longest',
+                 '_size')
+
     def __init__(self, symbol, children):
         """(RegexTree, str, list of RegexTrees) -> NoneType
 
@@ -40,31 +48,240 @@ class RegexTree:
         """
         self._symbol = symbol
         self._children = children[:]
+        # the hash only depends on the symbol and the children's hashes, so
+        # working it out now is O(1) (nodes are never changed once made)
+        self._hash = hash((symbol,) + tuple(
+            [child._hash for child in self._children]))
+        # the lengths of the shortest and longest strings matched (the
+        # longest is INFINITY if there is no longest), and the number of
+        # nodes, also only depend on the children
+        children = self._children
+        if not children:
+            # 'e' matches the empty string, any other leaf one character
+            self._shortest = self._longest = int(symbol != 'e')
+            self._size = 1
+        elif len(children) == 1:
+            self._shortest = 0
+            # repeating a child that only matches '' still only matches ''
+            if children[0]._longest == 0:
+                self._longest = 0
+            else:
+                self._longest = INFINITY
+            self._size = children[0]._size + 1
+        else:
+            left, right = children
+            if symbol == '|':
+                self._shortest = min(left._shortest, right._shortest)
+                self._longest = max(left._longest, right._longest)
+            else:
+                self._shortest = left._shortest + right._shortest
+                self._longest = left._longest + right._longest
+            self._size = left._size + right._size + 1
 
     def __repr__(self):
         """(RegexTree) -> str
 
-        Return string representation of this RegexTree.
+        Return string representation of this RegexTree. Trees too deep to
+        print recursively are printed by _repr_iteratively instead.
+
+        >>> StarTree(StarTree(Leaf('1')))
+        StarTree(StarTree(Leaf('1')))
+        >>> RegexTree('|', [Leaf('0'), RegexTree('1', [])])
+        RegexTree('|', [Leaf('0'), RegexTree('1', [])])
+        """
+        try:
+            text = 'RegexTree({}, {})'.format(
+                repr(self._symbol), repr(self._children))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_iteratively(self):
+        """(RegexTree) -> str
+
+        Return string representation of this RegexTree, walking the tree
+        with an explicit stack so that trees of any depth can be printed.
+
+        >>> StarTree(DotTree(Leaf('1'), Leaf('e')))._repr_iteratively()
+        "StarTree(DotTree(Leaf('1'), Leaf('e')))"
+        """
+        pieces = []
+        # strings still to be written, and nodes still to be expanded, in
+        # reverse order
+        to_write = [self]
+        while to_write:
+            item = to_write.pop()
+            if type(item) is str:
+                pieces.append(item)
+            else:
+                opening, closing = item._repr_pieces()
+                pieces.append(opening)
+                children = item._children
+                if children:
+                    # children separated by commas, the first one on top
+                    to_write.append(closing)
+                    for child in reversed(children[1:]):
+                        to_write.append(child)
+                        to_write.append(', ')
+                    to_write.append(children[0])
+                else:
+                    pieces.append(closing)
+        return ''.join(pieces)
+
+    def _repr_pieces(self):
+        """(RegexTree) -> tuple of (str, str)
+
+        Return the text written before and after the children of this node
+        in its string representation
         """
-        return 'RegexTree({}, {})'.format(
-            repr(self._symbol), repr(self._children))
+        return 'RegexTree({}, ['.format(repr(self._symbol)), '])'
 
     def __eq__(self, other):
         """(RegexTree, object) -> bool
 
-        Return whether RegexTree self is equivalent to other
+        Return whether RegexTree self is equivalent to other. Trees too deep
+        to compare recursively are compared by _equal_iteratively instead.
 
         >>> RegexTree("1", []).__eq__(RegexTree("2", []))
         False
         >>> RegexTree("2", []).__eq__(RegexTree("2", []))
         True
         """
-        # cool trick here, we can compare the children variables
-        # because Python will call the __eq__ methods of each
-        # member of the list to check that they're equal
-        return (isinstance(other, RegexTree) and
-                self._symbol == other._symbol and
-                self._children == other._children)
+        # trees with different hashes can never be equivalent, and the same
+        # node (as with interned trees) always is, so most comparisons are
+        # over before walking either tree
+        if self is other:
+            equal = True
+        elif not isinstance(other, RegexTree) or self._hash != other._hash:
+            equal = False
+        else:
+            try:
+                # cool trick here, we can compare the children variables
+                # because Python will call the __eq__ methods of each
+                # member of the list to check that they're equal
+                equal = (self._symbol == other._symbol and
+                         self._children == other._children)
+            except RecursionError:
+                equal = self._equal_iteratively(other)
+        return equal
+
+    def _equal_iteratively(self, other):
+        """(RegexTree, object) -> bool
+
+        Return whether RegexTree self is equivalent to other, walking both
+        trees with an explicit stack so that trees of any depth can be
+        compared.
+
+        >>> StarTree(Leaf('1'))._equal_iteratively(StarTree(Leaf('1')))
+        True
+        >>> StarTree(Leaf('1'))._equal_iteratively(StarTree(Leaf('2')))
+        False
+        """
+        # the nodes still to be compared, in two parallel stacks (the
+        # children of a RegexTree are always RegexTrees, so only other has to
+        # be checked)
+        equal = isinstance(other, RegexTree)
+        nodes = [self]
+        other_nodes = [other]
+        while equal and nodes:
+            node = nodes.pop()
+            other_node = other_nodes.pop()
+            # the same node is always equivalent to itself
+            if node is not other_node:
+                children = node._children
+                other_children = other_node._children
+                equal = (node._hash == other_node._hash and
+                         node._symbol == other_node._symbol and
+                         len(children) == len(other_children))
+                if children:
+                    nodes.extend(children)
+                    other_nodes.extend(other_children)
+        return equal
+
+    def __hash__(self):
+        """(RegexTree) -> int
+
+        Return a hash of this RegexTree that only depends on its structure,
+        so that equivalent trees hash the same and can be used as dict keys.
+        It is worked out once, when the node is made.
+
+        >>> hash(RegexTree("1", [])) == hash(RegexTree("1", []))
+        True
+        >>> len({DotTree(Leaf('0'), Leaf('1')), DotTree(Leaf('0'), Leaf('1'))})
+        1
+        """
+        return self._hash
+
+    def __getstate__(self):
+        """(RegexTree) -> tuple of (str, list of RegexTree)
+
+        Return what is needed to rebuild this RegexTree when it is pickled or
+        copied. The hash is left out, since string hashes differ between runs.
+        """
+        return self._symbol, self._children
+
+    def __setstate__(self, state):
+        """(RegexTree, tuple of (str, list of RegexTree)) -> NoneType
+
+        Rebuild this RegexTree from state, as returned by __getstate__
+
+        >>> import pickle
+        >>> tree = StarTree(BarTree(Leaf('0'), Leaf('e')))
+        >>> copy = pickle.loads(pickle.dumps(tree))
+        >>> copy == tree and hash(copy) == hash(tree)
+        True
+        """
+        RegexTree.__init__(self, state[0], state[1])
+
+    def intern(self, table):
+        """(RegexTree, dict) -> RegexTree
+
+        Return a tree equivalent to this RegexTree in which equivalent
+        subtrees are the same node, so that comparing them is an identity
+        check. table maps every node interned so far to itself; passing the
+        same table to several calls makes equivalent subtrees of all of them
+        the same node. Nodes are reused where possible (so this tree must not
+        be changed afterwards), and the tree is walked with an explicit stack,
+        so it can be of any depth.
+
+        >>> table = {}
+        >>> left = DotTree(StarTree(Leaf('1')), Leaf('0')).intern(table)
+        >>> right = BarTree(Leaf('0'), StarTree(Leaf('1'))).intern(table)
+        >>> left.get_children()[0] is right.get_children()[1]
+        True
+        >>> left.get_children()[1] is right.get_children()[0]
+        True
+        """
+        # the interned subtrees waiting for their parent
+        done = []
+        to_intern = [(self, False)]
+        while to_intern:
+            node, children_done = to_intern.pop()
+            children = node._children
+            if children and not children_done:
+                to_intern.append((node, True))
+                for child in reversed(children):
+                    to_intern.append((child, False))
+            else:
+                interned = done[len(done) - len(children):]
+                del done[len(done) - len(children):]
+                # a copy of the node is only needed if a child was replaced
+                for i in range(len(children)):
+                    if interned[i] is not children[i]:
+                        copy = type(node).__new__(type(node))
+                        copy._symbol = node._symbol
+                        copy._children = interned
+                        copy._hash = node._hash
+                        copy._shortest = node._shortest
+                        copy._longest = node._longest
+                        copy._size = node._size
+                        node = copy
+                        break
+                # the children are interned now, so looking the node up only
+                # compares them by identity
+                done.append(table.setdefault(node, node))
+        return done[0]
 
     def get_symbol(self):
         """(RegexTree) -> str
@@ -81,9 +298,38 @@ class RegexTree:
         """
         return self._children
 
+    def get_length_bounds(self):
+        """(RegexTree) -> tuple of (int, number)
+
+        Return the length of the shortest and of the longest string this
+        RegexTree matches. The longest is float('inf') if it can match
+        strings of any length.
+
+        >>> DotTree(StarTree(Leaf('1')), BarTree(Leaf('e'), Leaf('0'))
+        ...         ).get_length_bounds()
+        (0, inf)
+        >>> BarTree(Leaf('e'), DotTree(Leaf('0'), Leaf('2'))
+        ...         ).get_length_bounds()
+        (0, 2)
+        """
+        return self._shortest, self._longest
+
+    def get_size(self):
+        """(RegexTree) -> int
+
+        Return the number of nodes in this RegexTree (counting a subtree
+        that appears in it twice twice)
+
+        >>> DotTree(StarTree(Leaf('1')), Leaf('0')).get_size()
+        4
+        """
+        return self._size
+
 
 class Leaf(RegexTree):
     """RegexTree with no children, used for symbols."""
+    __slots__ = ()
+
     def __init__(self, symbol):
         """(Leaf, str) -> NoneType
 
@@ -99,9 +345,54 @@ class Leaf(RegexTree):
         return 'Leaf({})'.format(
             repr(self._symbol))
 
+    def _repr_pieces(self):
+        """(Leaf) -> tuple of (str, str)
+
+        Return the text of the string representation of this Leaf
+        """
+        return 'Leaf({})'.format(
+            repr(self._symbol)), ''
+
+
+class SetLeaf(Leaf):
+    """Leaf matching any one of several symbols (like [01] in other regex
+    languages). Its symbol holds all of them, in sorted order.
+    """
+    __slots__ = ()
+
+    def __init__(self, symbols):
+        """(SetLeaf, str) -> NoneType
+
+        A new SetLeaf matching any one of the characters of symbols
+
+        REQ: symbols must be made of "0", "1" and "2" only
+
+        >>> SetLeaf('201')
+        SetLeaf('012')
+        """
+        Leaf.__init__(self, ''.join(sorted(set(symbols))))
+
+    def __repr__(self):
+        """(SetLeaf) -> str
+
+        Return string representation of this SetLeaf
+        """
+        return 'SetLeaf({})'.format(
+            repr(self._symbol))
+
+    def _repr_pieces(self):
+        """(SetLeaf) -> tuple of (str, str)
+
+        Return the text of the string representation of this SetLeaf
+        """
+        return 'SetLeaf({})'.format(
+            repr(self._symbol)), ''
+
 
 class UnaryTree(RegexTree):
     """RegexTree with a single child, so far used only for star nodes."""
+    __slots__ = ()
+
     def __init__(self, symbol, child):
         """(UnaryTree, str, RegexTree) -> NoneType
 
@@ -114,8 +405,21 @@ class UnaryTree(RegexTree):
 
         Return string representation of this UnaryTree
         """
-        return 'UnaryTree({}, {})'.format(
-            repr(self._symbol), repr(self._children[0]))
+        try:
+            text = 'UnaryTree({}, {})'.format(
+                repr(self._symbol), repr(self._children[0]))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_pieces(self):
+        """(UnaryTree) -> tuple of (str, str)
+
+        Return the text written before and after the child of this UnaryTree
+        in its string representation
+        """
+        return 'UnaryTree({}, '.format(repr(self._symbol)), ')'
 
     def get_child(self):
         """(UnaryTree) -> RegexTree
@@ -129,6 +433,8 @@ class BinaryTree(RegexTree):
     """RegexTree with two children.  so far, it's only used for bar
     and dot nodes.
     """
+    __slots__ = ()
+
     def __init__(self, symbol, left, right):
         """(BinaryTree, str, RegexTree, RegexTree) -> NoneType
 
@@ -141,9 +447,22 @@ class BinaryTree(RegexTree):
 
         Return string representation of this BinaryTree
         """
-        return 'BinaryTree({}, {}, {})'.format(repr(self._symbol),
-                                               repr(self._children[0]),
-                                               repr(self._children[1]))
+        try:
+            text = 'BinaryTree({}, {}, {})'.format(
+                repr(self._symbol), repr(self._children[0]),
+                repr(self._children[1]))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_pieces(self):
+        """(BinaryTree) -> tuple of (str, str)
+
+        Return the text written before and after the children of this
+        BinaryTree in its string representation
+        """
+        return 'BinaryTree({}, '.format(repr(self._symbol)), ')'
 
     def get_left_child(self):
         """(BinaryTree) -> RegexTree
@@ -172,6 +491,8 @@ StarTree(BarTree(RegexTree('0', []), \
 DotTree(RegexTree('1', []), RegexTree('1', [])))))
     True
     """
+    __slots__ = ()
+
     def __init__(self, child):
         """(StarTree, RegexTree) -> NoneType
 
@@ -184,7 +505,20 @@ DotTree(RegexTree('1', []), RegexTree('1', [])))))
 
         Return string representation of this StarTree
         """
-        return 'StarTree({})'.format(repr(self._children[0]))
+        try:
+            text = 'StarTree({})'.format(repr(self._children[0]))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_pieces(self):
+        """(StarTree) -> tuple of (str, str)
+
+        Return the text written before and after the child of this StarTree
+        in its string representation
+        """
+        return 'StarTree(', ')'
 
 
 class BarTree(BinaryTree):
@@ -197,6 +531,8 @@ RegexTree('1', []))
     True
     """
 
+    __slots__ = ()
+
     def __init__(self, left, right):
         """(BarTree, RegexTree, RegexTree) -> NoneType
 
@@ -207,13 +543,28 @@ RegexTree('1', []))
     def __repr__(self):
         """(BarTree) -> str
 
-        Return string representation of this BarTree"""
-        return 'BarTree({}, {})'.format(repr(self._children[0]),
-                                        repr(self._children[1]))
+        Return string representation of this BarTree
+        """
+        try:
+            text = 'BarTree({}, {})'.format(repr(self._children[0]),
+                                            repr(self._children[1]))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_pieces(self):
+        """(BarTree) -> tuple of (str, str)
+
+        Return the text written before and after the children of this BarTree
+        in its string representation"""
+        return 'BarTree(', ')'
 
 
 class DotTree(BinaryTree):
     """BinaryTree for a dot ('.')"""
+    __slots__ = ()
+
     def __init__(self, left, right):
         """(DotTree, RegexTree, RegexTree) -> NoneType
 
@@ -230,9 +581,22 @@ RegexTree('1', []))
     def __repr__(self):
         """(DotTree) -> str
 
-        Return string representation of this DotTree"""
-        return 'DotTree({}, {})'.format(repr(self._children[0]),
-                                        repr(self._children[1]))
+        Return string representation of this DotTree
+        """
+        try:
+            text = 'DotTree({}, {})'.format(repr(self._children[0]),
+                                            repr(self._children[1]))
+        except RecursionError:
+            # too deep to print recursively
+            text = self._repr_iteratively()
+        return text
+
+    def _repr_pieces(self):
+        """(DotTree) -> tuple of (str, str)
+
+        Return the text written before and after the children of this DotTree
+        in its string representation"""
+        return 'DotTree(', ')'
 
 
 if __name__ == '__main__':